@@ -0,0 +1,72 @@
+"""Benchmark of importing a zone with bulk_create_records and Record.save().
+
+Run with::
+
+    $ python manage.py test benchmarks/bench_bulk_create.py
+"""
+
+import sys
+import time
+
+from django.conf import settings
+from django.test import TestCase
+
+from powerdns.bulk import bulk_create_records
+from powerdns.models.powerdns import Domain, Record
+from powerdns.models.templates import DomainTemplate
+from powerdns.utils import AutoPtrOptions
+
+
+RECORDS = 50000
+
+# Record.save() is too slow to import a whole zone
+SAVED_RECORDS = 500
+
+
+def report(label, elapsed, count):
+    sys.stderr.write(
+        '\n{:<40} {:>8.2f} s {:>10.0f} records/s\n'.format(
+            label, elapsed, count / elapsed
+        )
+    )
+
+
+def make_records(domain, count, offset=0):
+    return [
+        Record(
+            domain=domain,
+            type='A',
+            name='host{}.{}'.format(i, domain.name),
+            content='10.{}.{}.{}'.format(i >> 16, (i >> 8) & 255, i & 255),
+            auto_ptr=AutoPtrOptions.ALWAYS,
+        )
+        for i in range(offset, offset + count)
+    ]
+
+
+class BulkCreateBenchmark(TestCase):
+
+    def setUp(self):
+        DomainTemplate.objects.create(
+            name=settings.DNSAAS_DEFAULT_REVERSE_DOMAIN_TEMPLATE
+        )
+        self.domain = Domain.objects.create(name='example.com')
+
+    def test_bulk_create(self):
+        """A zone with PTRs is imported in one go"""
+        records = make_records(self.domain, RECORDS)
+        start = time.perf_counter()
+        bulk_create_records(records)
+        report('bulk_create_records()', time.perf_counter() - start, RECORDS)
+        self.assertEqual(
+            Record.objects.filter(type='PTR').count(), RECORDS
+        )
+
+    def test_save(self):
+        """Records saved one by one, for comparison"""
+        records = make_records(self.domain, SAVED_RECORDS)
+        start = time.perf_counter()
+        for record in records:
+            record.full_clean()
+            record.save()
+        report('Record.save()', time.perf_counter() - start, SAVED_RECORDS)
@@ -0,0 +1,92 @@
+"""Benchmark of loading many records (CPU time and memory).
+
+Run with::
+
+    $ python manage.py test benchmarks/bench_records.py
+"""
+
+import sys
+import time
+import tracemalloc
+
+from django.test import TestCase
+
+from powerdns.models.powerdns import Domain, Record
+
+
+RECORDS = 100000
+
+
+def report(label, elapsed, memory):
+    sys.stderr.write(
+        '\n{:<40} {:>8.2f} s {:>10.1f} B/record\n'.format(
+            label, elapsed, memory / RECORDS
+        )
+    )
+
+
+def eager_snapshot(record):
+    """What a snapshot taken in __init__ would cost"""
+    return {
+        field.attname: record.__dict__.get(field.attname)
+        for field in record._meta.concrete_fields
+    }
+
+
+class RecordLoadingBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        domain = Domain.objects.create(name='example.com')
+        Record.objects.bulk_create(
+            Record(
+                domain=domain,
+                type='A',
+                name='host{}.example.com'.format(i),
+                content='10.{}.{}.{}'.format(
+                    i >> 16, (i >> 8) & 255, i & 255
+                ),
+                number=0x0a000000 + i,
+            )
+            for i in range(RECORDS)
+        )
+
+    def measure(self, func):
+        """Run `func` twice, to measure time and (more slowly) memory"""
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        result = func()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return result, elapsed, memory
+
+    def test_load(self):
+        """Loading records takes one query each time and no snapshots"""
+        with self.assertNumQueries(2):
+            records, elapsed, memory = self.measure(
+                lambda: list(Record.objects.all())
+            )
+        report('Record.objects.all()', elapsed, memory)
+        self.assertEqual(len(records), RECORDS)
+        self.assertFalse(
+            any('_original_values' in r.__dict__ for r in records)
+        )
+        snapshots, elapsed, memory = self.measure(
+            lambda: [eager_snapshot(record) for record in records]
+        )
+        report('eager snapshots (for comparison)', elapsed, memory)
+
+    def test_modify(self):
+        """Modifying a field remembers only that field"""
+        records = list(Record.objects.all())
+        tracemalloc.start()
+        start = time.perf_counter()
+        for record in records:
+            record.ttl = 600
+        elapsed = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        report('first assignment of ttl (traced)', elapsed, memory)
+        self.assertEqual(records[0].get_changed_fields(), {'ttl'})
@@ -0,0 +1,46 @@
+"""Benchmark of validating record contents in batches.
+
+Run with::
+
+    $ python manage.py test benchmarks/bench_validation.py
+"""
+
+import itertools
+import sys
+import time
+import unittest
+
+from powerdns.validation import validate_contents
+
+
+ROWS = 1000000
+
+# The target is a million rows per minute on one core
+TARGET = ROWS / 60
+
+SAMPLE = [
+    ('A', '10.20.30.40'),
+    ('AAAA', '2001:db8::1'),
+    ('CNAME', 'www.example.com'),
+    ('MX', 'mail.example.com'),
+    ('SRV', '10 5060 sip.example.com'),
+    ('TXT', '"v=spf1 mx -all"'),
+    ('NAPTR', '100 10 "u" "E2U+sip" "!^.*$!sip:info@example.com!" .'),
+    ('SOA', 'ns1.example.com hostmaster.example.com 1 43200 600 1209600 600'),
+    ('A', '10.20.30.400'),
+]
+
+
+class ValidationBenchmark(unittest.TestCase):
+
+    def test_throughput(self):
+        """A million mixed rows are validated within a minute"""
+        rows = list(itertools.islice(itertools.cycle(SAMPLE), ROWS))
+        start = time.perf_counter()
+        errors = validate_contents(rows)
+        elapsed = time.perf_counter() - start
+        sys.stderr.write('\n{:<40} {:>8.2f} s {:>10.0f} rows/s\n'.format(
+            'validate_contents', elapsed, ROWS / elapsed,
+        ))
+        self.assertEqual(len(errors), ROWS // len(SAMPLE))
+        self.assertGreater(ROWS / elapsed, TARGET)
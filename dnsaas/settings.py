@@ -25,6 +25,14 @@ if TESTING:
         }
     }
     EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    # The test database is rolled back without sending any signals, so
+    # nothing may outlive a test in the cache. Tests of caching behaviour
+    # turn it on explicitly.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }
+    }
 else:
     DATABASES = {
         'default': {
@@ -157,6 +165,8 @@ NOSE_ARGS = [
 
 DNSAAS_DEFAULT_REVERSE_DOMAIN_TEMPLATE = 'reverse'
 
+DNSAAS_RECTIFY_IN_BACKGROUND = not TESTING
+
 REST_FRAMEWORK = {
     'VIEW_DESCRIPTION_FUNCTION':
         'rest_framework_swagger.views.get_restructuredtext',
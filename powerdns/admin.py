@@ -1,9 +1,14 @@
 import autocomplete_light
 import rules
 from django.contrib.auth import get_user_model
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.actions import delete_selected
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.admin.widgets import AdminRadioSelect
+from django.contrib.admin.utils import model_ngettext
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import PermissionDenied
 from django.db import models
 from django.forms import (
     HiddenInput,
@@ -12,13 +17,16 @@ from django.forms import (
     ValidationError,
     ModelChoiceField,
 )
-from django.utils.translation import ugettext_lazy as _
+from django.utils.encoding import force_text
+from django.utils.translation import ugettext, ugettext_lazy as _
 from django_extensions.admin import ForeignKeyAutocompleteAdmin
+from powerdns.bulk import delete_domain
 from powerdns.models.powerdns import (
     CryptoKey,
     Domain,
     DomainMetadata,
     Record,
+    REVERSE_DOMAINS_Q,
     SuperMaster,
 )
 from powerdns.models.authorisations import Authorisation
@@ -29,13 +37,19 @@ from threadlocals.threadlocals import get_current_user
 from powerdns.models.templates import (
     DomainTemplate,
     RecordTemplate,
+    get_domain_template,
 )
 from powerdns.models.requests import (
     DeleteRequest,
     DomainRequest,
     RecordRequest,
 )
-from powerdns.utils import Owned, DomainForRecordValidator, is_owner
+from powerdns.utils import (
+    Owned,
+    DomainForRecordValidator,
+    is_owner,
+    reverse_to_network,
+)
 
 
 class NullBooleanRadioSelect(NullBooleanSelect, AdminRadioSelect):
@@ -46,6 +60,7 @@ try:
     from django.contrib.admin import SimpleListFilter
 except ImportError:
     _domain_filters = ('type', 'last_check', 'account',)
+    _record_filters = ()
 else:
     class ReverseDomainListFilter(SimpleListFilter):
         title = _('domain class')
@@ -60,16 +75,62 @@ else:
             )
 
         def queryset(self, request, queryset):
-            q = (models.Q(name__endswith='.in-addr.arpa') |
-                 models.Q(name__endswith='.ip6.arpa'))
             if self.value() == 'fwd':
-                return queryset.exclude(q)
+                return queryset.exclude(REVERSE_DOMAINS_Q)
             if self.value() == 'rev':
-                return queryset.filter(q)
+                return queryset.filter(REVERSE_DOMAINS_Q)
+
+    class AccessListFilter(SimpleListFilter):
+        title = _('access')
+
+        parameter_name = 'access'
+
+        def lookups(self, request, model_admin):
+            return (
+                ('editable', _('editable by me')),
+                ('visible', _('editable or unrestricted')),
+            )
+
+        def queryset(self, request, queryset):
+            if self.value() == 'editable':
+                return queryset.editable_by(request.user)
+            if self.value() == 'visible':
+                return queryset.visible_to(request.user)
+
     _domain_filters = (
-        ReverseDomainListFilter, 'type', 'last_check', 'account',
+        AccessListFilter, ReverseDomainListFilter, 'type', 'last_check',
+        'account',
     )
 
+    class SubnetListFilter(SimpleListFilter):
+        title = _('subnet')
+
+        parameter_name = 'subnet'
+
+        def lookups(self, request, model_admin):
+            # Networks of the reverse domains. Any other network can be
+            # given in the URL.
+            networks = []
+            for name in Domain.objects.filter(
+                REVERSE_DOMAINS_Q
+            ).values_list('name', flat=True):
+                network = reverse_to_network(name)
+                if network is not None:
+                    networks.append(network)
+            return [
+                (network.strCompressed(), network.strCompressed())
+                for network in sorted(networks)
+            ]
+
+        def queryset(self, request, queryset):
+            if self.value() is None:
+                return queryset
+            try:
+                return queryset.in_network(self.value())
+            except ValueError as e:
+                raise IncorrectLookupParameters(e)
+    _record_filters = (AccessListFilter, SubnetListFilter)
+
 
 class RecordAdminForm(ModelForm):
 
@@ -101,7 +162,7 @@ class CopyingAdmin(admin.ModelAdmin):
         form = super().get_form(request, obj, **kwargs)
         from_pk = request.GET.get(self.from_field)
         if from_pk is not None:
-            self.from_object = self.FromModel.objects.get(pk=from_pk)
+            self.from_object = self.get_from_object(from_pk)
             for field in self.CopyFieldsModel.copy_fields:
                 form.base_fields[field[len(self.field_prefix):]].initial = \
                     getattr(self.from_object, field[len(self.target_prefix):])
@@ -109,6 +170,9 @@ class CopyingAdmin(admin.ModelAdmin):
             self.from_object = None
         return form
 
+    def get_from_object(self, pk):
+        return self.FromModel.objects.get(pk=pk)
+
 
 class RequestAdmin(CopyingAdmin):
     """Admin for domain/record requests"""
@@ -120,9 +184,25 @@ class RequestAdmin(CopyingAdmin):
         return form
 
 
+class OwnedChangeList(ChangeList):
+    """Changelist that loads the authorisations of a whole page at once, so
+    that the permissions of its rows are checked without further queries"""
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            *self.model_admin.prefetch_authorisations
+        )
+
+
 class OwnedAdmin(ForeignKeyAutocompleteAdmin, ObjectPermissionsModelAdmin):
     """Admin for models with owner field"""
 
+    # Authorisations that permissions of the changelist rows depend on
+    prefetch_authorisations = ('authorisations',)
+
+    def get_changelist(self, request, **kwargs):
+        return OwnedChangeList
+
     def save_model(self, request, object_, form, change):
         if object_.owner is None:
             object_.owner = request.user
@@ -152,7 +232,11 @@ class RecordAdmin(OwnedAdmin, CopyingAdmin):
         'request_deletion',
     )
     list_display_links = None
-    list_filter = ('type', 'ttl', 'auth', 'domain', 'created', 'modified')
+    list_select_related = ('domain', 'owner')
+    prefetch_authorisations = ('authorisations', 'domain__authorisations')
+    list_filter = _record_filters + (
+        'type', 'ttl', 'auth', 'domain', 'created', 'modified',
+    )
     list_per_page = 250
     save_on_top = True
     search_fields = ('name', 'content',)
@@ -199,6 +283,32 @@ class DomainMetadataInline(admin.TabularInline):
     extra = 0
 
 
+def delete_selected_domains(modeladmin, request, queryset):
+    """The default delete action, but deleting every domain with
+    `delete_domain` instead of collecting all its records first"""
+    if not request.POST.get('post'):
+        # The confirmation page
+        return delete_selected(modeladmin, request, queryset)
+    if not modeladmin.has_delete_permission(request):
+        raise PermissionDenied
+    domains = list(queryset)
+    for domain in domains:
+        if not modeladmin.has_delete_permission(request, domain):
+            raise PermissionDenied
+    for domain in domains:
+        modeladmin.log_deletion(request, domain, force_text(domain))
+        delete_domain(domain)
+    if domains:
+        modeladmin.message_user(
+            request,
+            ugettext('Successfully deleted %(count)d %(items)s.') % {
+                'count': len(domains),
+                'items': model_ngettext(modeladmin.opts, len(domains)),
+            },
+            messages.SUCCESS,
+        )
+
+
 class DomainAdmin(OwnedAdmin, CopyingAdmin):
     inlines = [DomainMetadataInline]
     list_display = (
@@ -221,6 +331,23 @@ class DomainAdmin(OwnedAdmin, CopyingAdmin):
     CopyFieldsModel = DomainTemplate
     from_field = 'template'
 
+    def get_from_object(self, pk):
+        return get_domain_template(pk)
+
+    def delete_model(self, request, obj):
+        delete_domain(obj)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # The confirmation page posts the name of the default action
+        if 'delete_selected' in actions:
+            actions['delete_selected'] = (
+                delete_selected_domains,
+                'delete_selected',
+                delete_selected.short_description,
+            )
+        return actions
+
 
 class SuperMasterAdmin(admin.ModelAdmin):
     list_display = ('ip', 'nameserver', 'account',)
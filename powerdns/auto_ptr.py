@@ -0,0 +1,183 @@
+"""Set-based maintenance of automatic PTR records.
+
+The PTR records of A records (see the `auto_ptr` option) are normally
+created one by one by the `create_ptr` signal receiver. The reconciler here
+computes the PTRs that should exist for many A records at once, compares
+them with the existing ones in memory and writes only the differences.
+"""
+
+import time
+from collections import defaultdict, namedtuple
+
+from django.db import router, transaction
+
+from powerdns.bulk import (
+    bulk_update,
+    delete_records,
+    prepare_records,
+)
+from powerdns.models.authorisations import grant_access, update_access
+from powerdns.models.powerdns import (
+    Domain,
+    REVERSE_DOMAINS_Q,
+    Record,
+    get_reverse_template,
+    load_zones,
+)
+from powerdns.rectify import BATCH_SIZE
+from powerdns.serials import coalesce_serials, mark_dirty
+from powerdns.utils import AutoPtrOptions, chunks, reverse_name, to_reverse
+
+
+# A record that might need a PTR
+Source = namedtuple(
+    'Source', 'pk domain_id type name content auto_ptr owner_id'
+)
+
+# An existing or wanted PTR record
+PTR = namedtuple('PTR', 'pk depends_on_id domain_id name content owner_id')
+
+# The differences between wanted and existing PTRs. PTRs in `inserts` and
+# `updates` have a domain_id of None if their domain is one of
+# `new_domains`, a {name: forward domain id} dict.
+PTRChanges = namedtuple('PTRChanges', 'new_domains inserts updates deletes')
+
+
+def get_wanted_ptrs(sources):
+    """Return the new domains and a {source pk: (zone name, PTR)} dict of
+    the PTRs that should exist for `sources`."""
+    sources = [
+        source for source in sources
+        if source.type == 'A' and source.auto_ptr != AutoPtrOptions.NEVER
+    ]
+    # The reconciler shouldn't trust the cached zones
+    zones = load_zones(Domain.objects.filter(REVERSE_DOMAINS_Q))
+    new_domains = {}
+    wanted = {}
+    for source in sources:
+        name = reverse_name(source.content)
+        found = zones.find(name)
+        if found is not None:
+            zone, domain_id = found
+        elif source.auto_ptr != AutoPtrOptions.ALWAYS:
+            continue
+        else:
+            zone, domain_id = to_reverse(source.content)[0], None
+            new_domains.setdefault(zone, source.domain_id)
+        wanted[source.pk] = (zone, PTR(
+            pk=None,
+            depends_on_id=source.pk,
+            domain_id=domain_id,
+            name=name,
+            content=source.name,
+            owner_id=source.owner_id,
+        ))
+    return new_domains, wanted
+
+
+def diff_ptrs(sources, existing):
+    """Compare the PTRs wanted for `sources` with `existing` ones (the PTR
+    rows depending on them). Returns PTRChanges."""
+    new_domains, wanted = get_wanted_ptrs(sources)
+    by_source = defaultdict(list)
+    for ptr in existing:
+        by_source[ptr.depends_on_id].append(ptr)
+    inserts, updates, deletes = [], [], []
+    for source in sources:
+        current = by_source.pop(source.pk, [])
+        if source.pk not in wanted:
+            deletes.extend(current)
+            continue
+        zone, ptr = wanted[source.pk]
+        if not current:
+            inserts.append((zone, ptr))
+            continue
+        # Keep an identical PTR, otherwise update one of them in place
+        for i, old in enumerate(current):
+            if old._replace(pk=None) == ptr:
+                break
+        else:
+            i = 0
+            updates.append((zone, ptr._replace(pk=current[0].pk)))
+        deletes.extend(current[:i] + current[i + 1:])
+    # PTRs of records that are not among sources are left alone
+    return PTRChanges(new_domains, inserts, updates, deletes)
+
+
+def _create_domains(new_domains):
+    forward_domains = Domain.objects.in_bulk(set(new_domains.values()))
+    created = {}
+    for name, forward_id in new_domains.items():
+        forward_domain = forward_domains[forward_id]
+        # Only a few domains, which need their templates applied
+        created[name] = Domain.objects.create(
+            name=name,
+            template=get_reverse_template(forward_domain),
+            type=forward_domain.type,
+        )
+    return created
+
+
+def apply_ptr_changes(changes, old_domain_ids=()):
+    """Write PTRChanges to the database. `old_domain_ids` are the domains
+    of the updated PTRs, whose serials change too."""
+    change_date = int(time.time())
+    created = _create_domains(changes.new_domains)
+    records = {'inserts': [], 'updates': []}
+    for kind in records:
+        for zone, ptr in getattr(changes, kind):
+            fields = ptr._asdict()
+            if fields['domain_id'] is None:
+                fields['domain_id'] = created[zone].pk
+            records[kind].append(Record(type='PTR', **fields))
+    domain_ids = {
+        record.domain_id for kind in records for record in records[kind]
+    }
+    domain_ids.update(old_domain_ids)
+    domain_ids.update(ptr.domain_id for ptr in changes.deletes)
+    domains = Domain.objects.in_bulk(domain_ids)
+    prepare_records(
+        records['inserts'] + records['updates'], domains, change_date
+    )
+    Record.objects.bulk_create(records['inserts'], batch_size=BATCH_SIZE)
+    # New PTRs are the only ones depending on their A records
+    for batch in chunks(records['inserts'], BATCH_SIZE):
+        grant_access(Record, dict(Record.objects.filter(
+            depends_on__in=[record.depends_on_id for record in batch],
+        ).values_list('pk', 'owner_id')))
+    bulk_update(records['updates'], [
+        'domain', 'name', 'reversed_name', 'content', 'owner', 'ordername',
+        'change_date',
+    ])
+    update_access(Record, [record.pk for record in records['updates']])
+    for batch in chunks(changes.deletes, BATCH_SIZE):
+        delete_records(
+            Record.objects.filter(pk__in=[ptr.pk for ptr in batch])
+        )
+    mark_dirty(*domain_ids)
+
+
+def reconcile_ptrs(records, dry_run=False):
+    """Make the automatic PTR records of a queryset of records what they
+    should be. Returns the PTRChanges, which are always computed but only
+    applied if `dry_run` is not set."""
+    sources = [
+        Source(*row) for row in records.order_by().values_list(
+            *Source._fields
+        ).iterator()
+    ]
+    existing = [
+        PTR(*row) for row in Record.objects.filter(
+            depends_on__in=records.order_by().values('pk'),
+        ).order_by('pk').values_list(*PTR._fields).iterator()
+    ]
+    changes = diff_ptrs(sources, existing)
+    if not dry_run:
+        old_domain_ids = {ptr.pk: ptr.domain_id for ptr in existing}
+        old_domain_ids = {
+            old_domain_ids[ptr.pk] for _, ptr in changes.updates
+        }
+        with transaction.atomic(using=router.db_for_write(Record)):
+            with coalesce_serials():
+                apply_ptr_changes(changes, old_domain_ids)
+    return changes
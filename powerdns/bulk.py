@@ -0,0 +1,213 @@
+"""Creating and deleting many records at once.
+
+`Record.save()`, `Record.delete()` and their signals cost several queries
+per record (ordername, conflict checks, PTR maintenance). The functions here
+do the same work for a whole batch with a handful of set-based queries.
+"""
+
+import time
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db import models, router, transaction
+
+from powerdns.dnssec import generate_ordernames, get_dnssec_profile
+from powerdns.models.authorisations import (
+    Access,
+    Authorisation,
+    grant_access,
+)
+from powerdns.models.powerdns import Domain, Record
+from powerdns.models.requests import RecordRequest
+from powerdns.rectify import BATCH_SIZE
+from powerdns.serials import coalesce_serials, mark_dirty
+from powerdns.utils import chunks, reverse_labels, validate_conflicts
+from powerdns.validation import validate_contents
+
+
+# Relations are checked for the whole batch at once, not one query per record
+RELATION_FIELDS = ['domain', 'owner', 'template', 'depends_on']
+
+
+def validate_records(records, domains):
+    """Validate new records like `Record.full_clean()` would, raising a
+    single ValidationError listing all problems. `domains` maps domain ids to
+    domains."""
+    errors = []
+    seen = set()
+    valid = []
+    invalid = set()
+    for error in validate_contents(
+        (record.type, record.content or '') for record in records
+    ):
+        invalid.add(error.index)
+        errors.append('{}: {}'.format(records[error.index], error.message))
+    for index, record in enumerate(records):
+        try:
+            record.clean_fields(exclude=RELATION_FIELDS)
+        except ValidationError as e:
+            errors.extend('{}: {}'.format(record, m) for m in e.messages)
+            continue
+        if index in invalid:
+            continue
+        if record.domain_id not in domains:
+            errors.append('{}: Unknown domain'.format(record))
+        key = (record.name, record.type, record.content)
+        if key in seen:
+            errors.append('{}: Duplicated record'.format(record))
+        seen.add(key)
+        valid.append(record)
+    try:
+        validate_conflicts(valid)
+    except ValidationError as e:
+        errors.extend(e.messages)
+    names = {record.name for record in valid}
+    for batch in chunks(names, BATCH_SIZE):
+        for pk, name, type_, content in Record.objects.filter(
+            name__in=batch,
+        ).order_by().values_list('pk', 'name', 'type', 'content'):
+            if (name, type_, content) in seen:
+                errors.append(
+                    '{} IN {} {}: Record already exists: {}'.format(
+                        name, type_, content, pk
+                    )
+                )
+    if errors:
+        raise ValidationError(errors)
+
+
+def prepare_records(records, domains, change_date):
+    """Fill in the fields that `Record.save()` would compute."""
+    by_domain = defaultdict(list)
+    for record in records:
+        record.change_date = change_date
+        record.reversed_name = reverse_labels(record.name)
+        record.update_numbers()
+        by_domain[record.domain_id].append(record)
+    for domain_id, domain_records in by_domain.items():
+        profile = get_dnssec_profile(domain_id)
+        if not profile.signed:
+            for record in domain_records:
+                record.ordername = None
+            continue
+        ordernames = generate_ordernames(
+            profile,
+            domains[domain_id].name,
+            [record.name for record in domain_records],
+        )
+        for record, ordername in zip(domain_records, ordernames):
+            record.ordername = ordername
+
+
+def bulk_update(records, fields):
+    """Save the given fields of many records, with one UPDATE per batch"""
+    fields = [Record._meta.get_field(name) for name in fields]
+    # Every record costs two query parameters per field and its pk
+    batch_size = max(1, BATCH_SIZE * 3 // (2 * len(fields) + 1))
+    for batch in chunks(records, batch_size):
+        values = {}
+        for field in fields:
+            output_field = field
+            if field.rel:
+                output_field = field.rel.get_related_field()
+            values[field.attname] = models.Case(
+                *[
+                    models.When(
+                        pk=record.pk,
+                        then=models.Value(getattr(record, field.attname)),
+                    )
+                    for record in batch
+                ],
+                output_field=output_field
+            )
+        Record.objects.filter(
+            pk__in=[record.pk for record in batch]
+        ).update(**values)
+
+
+def set_pks(records):
+    """Set the primary keys of records saved with bulk_create, which
+    doesn't do it on every database."""
+    pks = {}
+    for batch in chunks(records, BATCH_SIZE):
+        pks.update(
+            ((name, type_, content), pk)
+            for pk, name, type_, content in Record.objects.filter(
+                name__in={record.name for record in batch},
+            ).order_by().values_list('pk', 'name', 'type', 'content')
+        )
+    for record in records:
+        record.pk = pks[record.name, record.type, record.content]
+
+
+def bulk_create_records(records, validate=True):
+    """Save many new records like `Record.save()` would, creating the PTR
+    records of A records and updating the SOA of each zone only once.
+    Returns the PTRChanges that were applied."""
+    from powerdns.auto_ptr import Source, apply_ptr_changes, diff_ptrs
+    records = list(records)
+    for record in records:
+        record.force_case()
+    domains = {}
+    for batch in chunks({record.domain_id for record in records}, BATCH_SIZE):
+        domains.update(
+            (domain.pk, domain)
+            for domain in Domain.objects.filter(pk__in=batch)
+        )
+    if validate:
+        validate_records(records, domains)
+    change_date = int(time.time())
+    with transaction.atomic(using=router.db_for_write(Record)):
+        # New reverse domains are saved with their templated records
+        with coalesce_serials():
+            prepare_records(records, domains, change_date)
+            Record.objects.bulk_create(records, batch_size=BATCH_SIZE)
+            set_pks(records)
+            grant_access(
+                Record, {record.pk: record.owner_id for record in records}
+            )
+            changes = diff_ptrs([
+                Source(*[
+                    getattr(record, field) for field in Source._fields
+                ])
+                for record in records
+            ], [])
+            apply_ptr_changes(changes)
+            mark_dirty(*{record.domain_id for record in records})
+    return changes
+
+
+def delete_records(queryset, using=None):
+    """Delete records and the objects Django would cascade to, without
+    loading them"""
+    using = using or router.db_for_write(Record)
+    pks = queryset.values('pk')
+    content_type = ContentType.objects.get_for_model(Record)
+    RecordRequest.objects.filter(record__in=pks)._raw_delete(using)
+    Authorisation.objects.filter(
+        content_type=content_type, target_id__in=pks,
+    )._raw_delete(using)
+    Access.objects.filter(
+        content_type=content_type, target_id__in=pks,
+    )._raw_delete(using)
+    queryset._raw_delete(using)
+
+
+def delete_domain(domain):
+    """Delete a domain like `domain.delete()` would, but removing its
+    records and their PTRs in other zones with set-based queries. The SOA of
+    each zone that loses a PTR is updated once."""
+    using = router.db_for_write(Domain)
+    records = Record.objects.using(using).filter(domain=domain)
+    dependent = Record.objects.using(using).filter(
+        depends_on__domain=domain,
+    ).exclude(domain=domain)
+    with transaction.atomic(using=using), coalesce_serials():
+        mark_dirty(*dependent.order_by().values_list(
+            'domain_id', flat=True
+        ).distinct())
+        delete_records(dependent, using)
+        delete_records(records, using)
+        # The remaining relations are few and handled by the collector
+        domain.delete(using=using)
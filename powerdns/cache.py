@@ -0,0 +1,113 @@
+"""Caches for data that is read on every write but changes rarely.
+
+Values are kept in a process-local dictionary backed by the Django cache.
+Every invalidation replaces a generation token stored in the Django cache, so
+other worker processes drop their local copies on their next lookup. This
+only works across processes if the Django cache itself is shared (e.g.
+memcached or redis).
+
+Invalidations made in a transaction happen at once and again when the
+transaction ends, since other processes may load the old values before the
+commit. Until then, the thread that made them computes values without caching
+them, as they are based on changes that may still be rolled back.
+"""
+
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import transaction
+from django.dispatch import receiver
+
+
+_caches = []
+
+
+class SharedCache(object):
+    """A namespaced two-level (process and Django cache) key-value cache."""
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._generation_key = 'powerdns:{}:generation'.format(namespace)
+        self._generation = None
+        self._local = {}
+        # Keys invalidated in the open transaction of a thread
+        self._uncommitted = threading.local()
+        _caches.append(self)
+
+    def _key(self, key):
+        return 'powerdns:{}:{}'.format(self.namespace, key)
+
+    def _sync(self):
+        """Drop local values if some process has invalidated the cache"""
+        generation = cache.get(self._generation_key)
+        if generation is None:
+            generation = uuid.uuid4().hex
+            cache.add(self._generation_key, generation)
+        if generation != self._generation:
+            self._local = {}
+            self._generation = generation
+
+    def _changed_in_transaction(self):
+        """Return True if the open transaction of this thread invalidated
+        some keys. Invalidates them again if the transaction has ended."""
+        keys = getattr(self._uncommitted, 'keys', None)
+        if not keys:
+            return False
+        if transaction.get_connection().in_atomic_block:
+            return True
+        # Django < 1.9 can't tell when the transaction has ended
+        self._transaction_ended()
+        return False
+
+    def _transaction_ended(self):
+        keys = getattr(self._uncommitted, 'keys', None)
+        self._uncommitted.keys = None
+        if keys:
+            self.invalidate(*keys)
+
+    def get(self, key, factory):
+        """Return the value for `key` computing it with `factory` if it's
+        not cached on any level."""
+        if self._changed_in_transaction():
+            return factory()
+        self._sync()
+        try:
+            return self._local[key]
+        except KeyError:
+            pass
+        value = cache.get(self._key(key))
+        if value is None:
+            value = factory()
+            cache.set(self._key(key), value)
+        self._local[key] = value
+        return value
+
+    def invalidate(self, *keys):
+        """Forget `keys` in this and in all other processes."""
+        cache.delete_many([self._key(key) for key in keys])
+        cache.set(self._generation_key, uuid.uuid4().hex)
+        self._local = {}
+        self._generation = None
+        if not transaction.get_connection().in_atomic_block:
+            return
+        uncommitted = getattr(self._uncommitted, 'keys', None)
+        if uncommitted is None:
+            uncommitted = self._uncommitted.keys = set()
+        uncommitted.update(keys)
+        if hasattr(transaction, 'on_commit'):
+            transaction.on_commit(self._transaction_ended)
+
+    def after_transaction(self):
+        """Invalidate the keys of the transaction of this thread again if it
+        has ended. Call this after an atomic block that may have been the
+        outermost one."""
+        self._changed_in_transaction()
+
+
+@receiver(request_finished, dispatch_uid='request_finished_caches')
+def end_transactions(sender, **kwargs):
+    # Requests might run in transactions (ATOMIC_REQUESTS) which have ended
+    for shared_cache in _caches:
+        shared_cache.after_transaction()
@@ -0,0 +1,130 @@
+"""Consistency checks of zones created before (or around) validation.
+
+Every check is a query (or a few) over a single zone, so zones can be
+checked in a pool of worker processes and the findings streamed out as they
+come, without holding more than one zone's findings in memory.
+"""
+
+import multiprocessing
+from collections import namedtuple
+from itertools import groupby
+
+from django.db import connections
+
+from powerdns.models.powerdns import CryptoKey, Domain, Record
+
+
+# Number of zones sent to a worker process at once
+CHUNK_SIZE = 16
+
+# Something wrong with an object (a record or a crypto key) of a zone.
+# `domain` is None for objects without a zone.
+Finding = namedtuple('Finding', 'check domain pk message')
+
+
+def check_soa(domain_name, records):
+    soas = list(
+        records.filter(type='SOA').order_by('pk').values_list('pk', flat=True)
+    )
+    if not soas:
+        yield Finding('missing_soa', domain_name, None, 'No SOA record')
+    for pk in soas[1:]:
+        yield Finding(
+            'extra_soa', domain_name, pk,
+            'More than one SOA record (first is {})'.format(soas[0]),
+        )
+
+
+def check_cname_conflicts(domain_name, records):
+    rows = records.filter(
+        name__in=records.filter(type='CNAME').values('name'),
+    ).order_by('name', 'pk').values_list('name', 'type', 'pk').iterator()
+    for name, group in groupby(rows, key=lambda row: row[0]):
+        group = list(group)
+        if len(group) == 1:
+            continue
+        for _, type_, pk in group:
+            if type_ != 'CNAME':
+                continue
+            yield Finding(
+                'cname_conflict', domain_name, pk,
+                'Conflicting records exist: {}'.format(', '.join(
+                    str(other_pk) for _, _, other_pk in group
+                    if other_pk != pk
+                )),
+            )
+
+
+def check_orphan_ptrs(domain_name, records):
+    # Only PTR records are maintained for other (A) records
+    for pk, type_, depends_on_id, depends_on_type in records.filter(
+        depends_on__isnull=False,
+    ).exclude(
+        type='PTR', depends_on__type='A',
+    ).values_list(
+        'pk', 'type', 'depends_on_id', 'depends_on__type',
+    ).iterator():
+        yield Finding(
+            'orphan_ptr', domain_name, pk,
+            '{} record depends on {} record {}'.format(
+                type_, depends_on_type, depends_on_id,
+            ),
+        )
+
+
+ZONE_CHECKS = [check_soa, check_cname_conflicts, check_orphan_ptrs]
+
+
+def check_zone(domain_id):
+    """Return the findings of all checks of a single zone"""
+    try:
+        domain_name = Domain.objects.values_list(
+            'name', flat=True
+        ).get(pk=domain_id)
+    except Domain.DoesNotExist:
+        return []
+    records = Record.objects.filter(domain_id=domain_id)
+    return [
+        finding
+        for check in ZONE_CHECKS
+        for finding in check(domain_name, records)
+    ]
+
+
+def check_orphan_cryptokeys():
+    """Yield findings for crypto keys whose domain has been deleted"""
+    for pk in CryptoKey.objects.filter(
+        domain__isnull=True,
+    ).order_by('pk').values_list('pk', flat=True).iterator():
+        yield Finding('orphan_cryptokey', None, pk, 'Crypto key has no domain')
+
+
+def _check_in_worker(domain_id):
+    try:
+        return check_zone(domain_id)
+    finally:
+        connections.close_all()
+
+
+def check_zones(domain_ids, processes=1):
+    """Yield the findings of many zones, checked in a pool of `processes`
+    worker processes if there is more than one."""
+    domain_ids = list(domain_ids)
+    if processes <= 1 or len(domain_ids) <= 1:
+        for domain_id in domain_ids:
+            for finding in check_zone(domain_id):
+                yield finding
+        return
+    # Forked workers mustn't share the database connections of the parent
+    connections.close_all()
+    pool = multiprocessing.Pool(processes)
+    try:
+        for findings in pool.imap_unordered(
+            _check_in_worker, domain_ids, chunksize=CHUNK_SIZE,
+        ):
+            for finding in findings:
+                yield finding
+    finally:
+        # The consumer might have stopped before all zones were checked
+        pool.terminate()
+        pool.join()
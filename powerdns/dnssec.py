@@ -0,0 +1,153 @@
+"""DNSSEC mode detection for domains and ordername generation"""
+
+from collections import namedtuple
+
+from powerdns.cache import SharedCache
+from powerdns.nsec3 import nsec3_hash, nsec3_hash_many
+
+
+UNSIGNED = 'unsigned'
+NSEC = 'nsec'
+NSEC3 = 'nsec3'
+NSEC3_NARROW = 'nsec3-narrow'
+
+# Domain metadata that influences the DNSSEC mode
+DNSSEC_METADATA_KINDS = ('NSEC3PARAM', 'NSEC3NARROW')
+
+
+NSEC3Param = namedtuple(
+    'NSEC3Param', ['algorithm', 'flags', 'iterations', 'salt']
+)
+
+
+class DNSSECProfile(namedtuple('DNSSECProfile', ['mode', 'nsec3param'])):
+    """The DNSSEC mode of a domain. `nsec3param` is a parsed NSEC3PARAM
+    metadata or None if the domain doesn't use NSEC3 or its NSEC3PARAM is not
+    supported."""
+
+    @property
+    def signed(self):
+        return self.mode != UNSIGNED
+
+
+UNSIGNED_PROFILE = DNSSECProfile(UNSIGNED, None)
+
+_profiles = SharedCache('dnssec-profile')
+
+
+def parse_nsec3param(content):
+    """
+    Parse the content of NSEC3PARAM metadata. Returns None for the
+    parameters we can't use to generate ordernames.
+
+    >>> parse_nsec3param('1 0 12 aabbccdd')
+    NSEC3Param(algorithm=1, flags=0, iterations=12, salt='aabbccdd')
+    >>> parse_nsec3param('1 0 1 -')
+    NSEC3Param(algorithm=1, flags=0, iterations=1, salt='')
+    >>> parse_nsec3param('2 0 12 aabbccdd') is None
+    True
+    """
+    try:
+        algorithm, flags, iterations, salt = content.split()
+        algorithm = int(algorithm)
+        flags = int(flags)
+        iterations = int(iterations)
+        if salt == '-':
+            salt = ''
+        bytes.fromhex(salt)
+    except (ValueError, TypeError, AttributeError):
+        return None
+    if algorithm != 1:
+        # SHA-1 is the only hash algorithm defined for NSEC3
+        return None
+    return NSEC3Param(algorithm, flags, iterations, salt.lower())
+
+
+def compute_dnssec_profile(domain_id):
+    """Compute the DNSSEC profile of a domain from the database."""
+    from powerdns.models.powerdns import CryptoKey, DomainMetadata
+    if not CryptoKey.objects.filter(domain_id=domain_id).exists():
+        return UNSIGNED_PROFILE
+    metadata = dict(
+        DomainMetadata.objects.filter(
+            domain_id=domain_id,
+            kind__in=DNSSEC_METADATA_KINDS,
+        ).values_list('kind', 'content')
+    )
+    if 'NSEC3PARAM' not in metadata:
+        return DNSSECProfile(NSEC, None)
+    if 'NSEC3NARROW' in metadata:
+        return DNSSECProfile(NSEC3_NARROW, None)
+    return DNSSECProfile(NSEC3, parse_nsec3param(metadata['NSEC3PARAM']))
+
+
+def get_dnssec_profile(domain_id):
+    """Return the (cached) DNSSEC profile of a domain."""
+    if domain_id is None:
+        return UNSIGNED_PROFILE
+    return _profiles.get(
+        domain_id, lambda: compute_dnssec_profile(domain_id)
+    )
+
+
+def invalidate_dnssec_profile(*domain_ids):
+    """Forget the cached DNSSEC profiles of given domains."""
+    domain_ids = [domain_id for domain_id in domain_ids if domain_id]
+    if domain_ids:
+        _profiles.invalidate(*domain_ids)
+
+
+def generate_ordername(profile, zone_name, name):
+    """Return the ordername of record `name` in zone `zone_name` with a
+    given DNSSEC profile."""
+    if profile.mode == UNSIGNED:
+        return None
+    if profile.mode == NSEC3_NARROW:
+        # When running in NSEC3 'Narrow' mode, the ordername field is
+        # ignored and best left empty.
+        return ''
+    if profile.mode == NSEC3:
+        return generate_ordername_nsec3(profile.nsec3param, name)
+    return generate_ordername_nsec(zone_name, name)
+
+
+def generate_ordername_nsec(zone_name, name):
+    '''
+    In 'NSEC' mode, it should contain the relative part of a domain name,
+    in reverse order, with dots replaced by spaces
+    '''
+    domain_words = zone_name.split('.')
+    host_words = name.split('.')
+    relative_word_count = len(host_words) - len(domain_words)
+    relative_words = host_words[0:relative_word_count]
+    ordername = ' '.join(relative_words[::-1])
+    return ordername
+
+
+def generate_ordername_nsec3(nsec3param, name):
+    '''
+    In 'NSEC3' non-narrow mode, the ordername should contain a lowercase
+    base32hex encoded representation of the salted & iterated hash of the
+    full record name.  "pdnssec hash-zone-record zone record" can be used
+    to calculate this hash.
+    '''
+    if nsec3param is None:
+        return None  # incompatible input
+    try:
+        return nsec3_hash(name, nsec3param.salt, nsec3param.iterations)
+    except UnicodeError:
+        return None
+
+
+def generate_ordernames(profile, zone_name, names):
+    """Return a list of ordernames for many records of one zone."""
+    if profile.mode == NSEC3 and profile.nsec3param is not None:
+        try:
+            return nsec3_hash_many(
+                names,
+                profile.nsec3param.salt,
+                profile.nsec3param.iterations,
+            )
+        except UnicodeError:
+            pass
+    return [generate_ordername(profile, zone_name, name) for name in names]
@@ -0,0 +1,63 @@
+"""Report inconsistencies of zones as newline-delimited JSON"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from powerdns.consistency import check_orphan_cryptokeys, check_zones
+from powerdns.models.powerdns import Domain
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Checks given zones for missing SOA records, CNAME conflicts and '
+        'orphan PTR records, writing a JSON object per finding'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('zones', nargs='*', metavar='zone')
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            default=False,
+            help='Check all zones and crypto keys without a zone',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Number of worker processes',
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            domains = Domain.objects.all()
+        elif options['zones']:
+            domains = Domain.objects.filter(name__in=options['zones'])
+            missing = set(options['zones']) - set(
+                domains.values_list('name', flat=True)
+            )
+            if missing:
+                raise CommandError(
+                    'No such zones: {}'.format(', '.join(sorted(missing)))
+                )
+        else:
+            raise CommandError('Specify zones to check or use --all')
+        findings = check_zones(
+            domains.order_by('pk').values_list('pk', flat=True),
+            processes=options['processes'],
+        )
+        count = 0
+        for finding in findings:
+            self.stdout.write(json.dumps(finding._asdict(), sort_keys=True))
+            count += 1
+        if options['all']:
+            for finding in check_orphan_cryptokeys():
+                self.stdout.write(
+                    json.dumps(finding._asdict(), sort_keys=True)
+                )
+                count += 1
+        # Keep the standard output parseable
+        if options['verbosity'] > 0:
+            self.stderr.write('{} findings'.format(count))
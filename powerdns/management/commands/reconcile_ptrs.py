@@ -0,0 +1,67 @@
+"""Create, update and delete the automatic PTR records of A records"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from powerdns.auto_ptr import reconcile_ptrs
+from powerdns.models.powerdns import Domain, Record
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Makes the automatic PTR records of the records in given zones what '
+        'their auto_ptr options say'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('zones', nargs='*', metavar='zone')
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            default=False,
+            help='Reconcile the records of all zones',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            default=False,
+            help='Only report what would be changed',
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            records = Record.objects.all()
+        elif options['zones']:
+            domains = Domain.objects.filter(name__in=options['zones'])
+            missing = set(options['zones']) - set(
+                domains.values_list('name', flat=True)
+            )
+            if missing:
+                raise CommandError(
+                    'No such zones: {}'.format(', '.join(sorted(missing)))
+                )
+            records = Record.objects.filter(domain__in=domains)
+        else:
+            raise CommandError('Specify zones to reconcile or use --all')
+        changes = reconcile_ptrs(records, dry_run=options['dry_run'])
+        if options['dry_run'] or options['verbosity'] > 1:
+            for name in sorted(changes.new_domains):
+                self.stdout.write('+ domain {}'.format(name))
+            for sign, kind in [('+', 'inserts'), ('~', 'updates')]:
+                for _, ptr in getattr(changes, kind):
+                    self.stdout.write('{} {} IN PTR {}'.format(
+                        sign, ptr.name, ptr.content
+                    ))
+            for ptr in changes.deletes:
+                self.stdout.write('- {} IN PTR {}'.format(
+                    ptr.name, ptr.content
+                ))
+        self.stdout.write(
+            '{}: {} domains, {} PTRs created, {} updated, {} deleted'.format(
+                'Dry run' if options['dry_run'] else 'Reconciled',
+                len(changes.new_domains),
+                len(changes.inserts),
+                len(changes.updates),
+                len(changes.deletes),
+            )
+        )
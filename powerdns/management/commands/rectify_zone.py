@@ -0,0 +1,48 @@
+"""Recompute DNSSEC ordernames of records (like `pdnssec rectify-zone`)"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from powerdns.models.powerdns import Domain
+from powerdns.rectify import rectify_zones
+
+
+class Command(BaseCommand):
+
+    help = 'Recomputes the DNSSEC ordernames of all records in given zones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('zones', nargs='*', metavar='zone')
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            default=False,
+            help='Rectify all zones',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Number of worker processes',
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            domains = Domain.objects.all()
+        elif options['zones']:
+            domains = Domain.objects.filter(name__in=options['zones'])
+            missing = set(options['zones']) - set(
+                domains.values_list('name', flat=True)
+            )
+            if missing:
+                raise CommandError(
+                    'No such zones: {}'.format(', '.join(sorted(missing)))
+                )
+        else:
+            raise CommandError('Specify zones to rectify or use --all')
+        result = rectify_zones(
+            domains.values_list('pk', flat=True),
+            processes=options['processes'],
+        )
+        self.stdout.write('Rectified {} records in {} zones'.format(
+            sum(result.values()), len(result)
+        ))
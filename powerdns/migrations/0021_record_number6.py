@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from IPy import IP
+
+
+# Each record costs four query parameters, SQLite allows 999
+BATCH_SIZE = 200
+
+INT64_OFFSET = 2 ** 63
+
+
+def backfill_number6(apps, schema_editor):
+    """Fill in the numeric form of existing AAAA records in batches"""
+    Record = apps.get_model('powerdns', 'Record')
+    records = Record.objects.using(schema_editor.connection.alias)
+    last_pk = 0
+    while True:
+        batch = list(
+            records.filter(type='AAAA', pk__gt=last_pk).order_by(
+                'pk'
+            ).values_list('pk', 'content')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        last_pk = batch[-1][0]
+        highs, lows = [], []
+        for pk, content in batch:
+            try:
+                number = IP(content).int()
+            except ValueError:
+                continue
+            highs.append(models.When(
+                pk=pk, then=models.Value((number >> 64) - INT64_OFFSET),
+            ))
+            lows.append(models.When(
+                pk=pk,
+                then=models.Value((number & (2 ** 64 - 1)) - INT64_OFFSET),
+            ))
+        if highs:
+            records.filter(pk__in=[pk for pk, _ in batch]).update(
+                number6_high=models.Case(
+                    *highs, output_field=models.BigIntegerField()
+                ),
+                number6_low=models.Case(
+                    *lows, output_field=models.BigIntegerField()
+                ),
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('powerdns', '0020_remove_recordrequest_target_ordername'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='record',
+            name='number6_high',
+            field=models.BigIntegerField(verbose_name='IPv6 number (high bits)', blank=True, null=True, default=None, editable=False),
+        ),
+        migrations.AddField(
+            model_name='record',
+            name='number6_low',
+            field=models.BigIntegerField(verbose_name='IPv6 number (low bits)', blank=True, null=True, default=None, editable=False),
+        ),
+        migrations.AlterIndexTogether(
+            name='record',
+            index_together=set([('number6_high', 'number6_low')]),
+        ),
+        migrations.RunPython(
+            backfill_number6, migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+# Each row costs three query parameters, SQLite allows 999
+BATCH_SIZE = 300
+
+
+def reverse_labels(name):
+    return '.'.join(name.lower().split('.')[::-1])
+
+
+def backfill_reversed_name(apps, schema_editor):
+    """Fill in the reversed names of existing domains and records in
+    batches"""
+    for model_name in ['Domain', 'Record']:
+        Model = apps.get_model('powerdns', model_name)
+        objects = Model.objects.using(schema_editor.connection.alias)
+        last_pk = 0
+        while True:
+            batch = list(
+                objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', 'name',
+                )[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                reversed_name=models.Case(
+                    *[
+                        models.When(
+                            pk=pk, then=models.Value(reverse_labels(name)),
+                        )
+                        for pk, name in batch
+                    ],
+                    output_field=models.CharField()
+                ),
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('powerdns', '0021_record_number6'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='domain',
+            name='reversed_name',
+            field=models.CharField(verbose_name='reversed name', max_length=255, blank=True, default='', db_index=True, editable=False, help_text='The name with its labels reversed, for subtree lookups'),
+        ),
+        migrations.AddField(
+            model_name='record',
+            name='reversed_name',
+            field=models.CharField(verbose_name='reversed name', max_length=255, blank=True, default='', db_index=True, editable=False, help_text='The name with its labels reversed, for subtree lookups'),
+        ),
+        migrations.RunPython(
+            backfill_reversed_name, migrations.RunPython.noop,
+        ),
+    ]
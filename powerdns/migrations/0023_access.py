@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import dj.choices.fields
+import powerdns.models.authorisations
+from django.conf import settings
+
+
+# Capability.CHANGE and Capability.DELETE
+CAPABILITIES = [1, 2]
+
+# Every row costs four query parameters, SQLite allows 999
+BATCH_SIZE = 200
+
+
+def backfill_access(apps, schema_editor):
+    """Create the Access rows of existing domains and records from their
+    owners and authorisations"""
+    alias = schema_editor.connection.alias
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Authorisation = apps.get_model('powerdns', 'Authorisation')
+    Access = apps.get_model('powerdns', 'Access')
+    for model_name in ['domain', 'record']:
+        Model = apps.get_model('powerdns', model_name)
+        content_type, _ = ContentType.objects.using(alias).get_or_create(
+            app_label='powerdns', model=model_name,
+        )
+        objects = Model.objects.using(alias)
+        last_pk = 0
+        while True:
+            batch = list(
+                objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', 'owner_id',
+                )[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            grants = {
+                (owner_id, pk) for pk, owner_id in batch if owner_id
+            }
+            grants.update(
+                Authorisation.objects.using(alias).filter(
+                    content_type=content_type,
+                    target_id__in=[pk for pk, _ in batch],
+                ).values_list('authorised_id', 'target_id')
+            )
+            Access.objects.using(alias).bulk_create(
+                [
+                    Access(
+                        user_id=user_id,
+                        content_type=content_type,
+                        target_id=target_id,
+                        capability=capability,
+                    )
+                    for user_id, target_id in grants
+                    for capability in CAPABILITIES
+                ],
+                batch_size=BATCH_SIZE,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('powerdns', '0022_reversed_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Access',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', primary_key=True, serialize=False, auto_created=True)),
+                ('target_id', models.PositiveIntegerField()),
+                ('capability', dj.choices.fields.ChoiceField(choices=powerdns.models.authorisations.Capability)),
+                ('content_type', models.ForeignKey(related_name='+', to='contenttypes.ContentType')),
+                ('user', models.ForeignKey(related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='authorisation',
+            index_together=set([('content_type', 'target_id')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='access',
+            unique_together=set([('user', 'content_type', 'capability', 'target_id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='access',
+            index_together=set([('content_type', 'target_id')]),
+        ),
+        migrations.RunPython(backfill_access, migrations.RunPython.noop),
+    ]
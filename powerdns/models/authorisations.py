@@ -1,10 +1,14 @@
 import rules
+from dj.choices import Choices
+from dj.choices.fields import ChoiceField
 from django.conf import settings
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from django.contrib.contenttypes.fields import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 
-from powerdns.utils import is_owner
+from powerdns.utils import chunks, is_owner
 
 
 class Authorisation(models.Model):
@@ -26,6 +30,9 @@ class Authorisation(models.Model):
     target_id = models.PositiveIntegerField()
     target = GenericForeignKey('content_type', 'target_id')
 
+    class Meta:
+        index_together = [('content_type', 'target_id')]
+
     def __str__(self):
         return '{} authorised {} to {}'.format(
             self.owner,
@@ -41,3 +48,137 @@ rules.add_perm(
 rules.add_perm(
     'powerdns.delete_authorisation', (rules.is_superuser | is_owner)
 )
+
+
+class Capability(Choices):
+    _ = Choices.Choice
+    CHANGE = _("change")
+    DELETE = _("delete")
+
+
+class Access(models.Model):
+    """What a user may do with an object, as given by the owner and the
+    authorisations of the object. Kept up to date by signals and the bulk
+    functions, so that the objects of a user can be found with an indexed
+    join. Superusers may do anything and are not listed."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+')
+    content_type = models.ForeignKey(ContentType, related_name='+')
+    target_id = models.PositiveIntegerField()
+    capability = ChoiceField(choices=Capability)
+
+    class Meta:
+        # The objects of a user are looked up by the unique index, the
+        # users of an object by the other one
+        unique_together = ('user', 'content_type', 'capability', 'target_id')
+        index_together = [('content_type', 'target_id')]
+
+
+# What owners and authorised users may do (see `can_edit` and `can_delete`)
+GRANTED_CAPABILITIES = [Capability.CHANGE, Capability.DELETE]
+
+# Models (app label, model name) whose Access rows are maintained
+ACCESS_MODELS = {('powerdns', 'domain'), ('powerdns', 'record')}
+
+# Number of objects whose access is recomputed at once. Every Access row
+# costs four query parameters, which must stay below SQLite's limit of 999.
+ACCESS_BATCH_SIZE = 200
+
+
+def _create_access(content_type, grants):
+    Access.objects.bulk_create(
+        [
+            Access(
+                user_id=user_id,
+                content_type=content_type,
+                target_id=target_id,
+                capability=capability.id,
+            )
+            for user_id, target_id in grants
+            for capability in GRANTED_CAPABILITIES
+        ],
+        batch_size=ACCESS_BATCH_SIZE,
+    )
+
+
+def grant_access(model, owners):
+    """Create the Access rows of new objects from a {pk: owner id} dict.
+    The objects mustn't have any Access rows yet."""
+    _create_access(ContentType.objects.get_for_model(model), [
+        (owner_id, pk) for pk, owner_id in owners.items() if owner_id
+    ])
+
+
+def update_access(model, target_ids):
+    """Recompute the Access rows of objects of an Owned model"""
+    content_type = ContentType.objects.get_for_model(model)
+    for batch in chunks(set(target_ids), ACCESS_BATCH_SIZE):
+        grants = set(model.objects.filter(
+            pk__in=batch, owner__isnull=False,
+        ).values_list('owner_id', 'pk'))
+        grants.update(Authorisation.objects.filter(
+            content_type=content_type, target_id__in=batch,
+        ).values_list('authorised_id', 'target_id'))
+        with transaction.atomic(using=router.db_for_write(Access)):
+            Access.objects.filter(
+                content_type=content_type, target_id__in=batch,
+            ).delete()
+            _create_access(content_type, grants)
+
+
+def delete_access(model, target_ids):
+    """Forget the Access rows of deleted objects"""
+    content_type = ContentType.objects.get_for_model(model)
+    for batch in chunks(list(target_ids), ACCESS_BATCH_SIZE):
+        Access.objects.filter(
+            content_type=content_type, target_id__in=batch,
+        ).delete()
+
+
+def accessible_ids(user, model, capability):
+    """Return a subquery of the ids of objects of `model` the user has a
+    capability for, to be used as `pk__in`. Superusers aren't considered."""
+    return Access.objects.filter(
+        user_id=getattr(user, 'pk', None),
+        content_type=ContentType.objects.get_for_model(model),
+        capability=capability,
+    ).values('target_id')
+
+
+def authorised_ids(user, model):
+    """Return a subquery of the ids of objects of `model` the user has been
+    authorised to, to be used as `pk__in`"""
+    return Authorisation.objects.filter(
+        authorised_id=getattr(user, 'pk', None),
+        content_type=ContentType.objects.get_for_model(model),
+    ).values('target_id')
+
+
+@receiver(
+    pre_save, sender=Authorisation, dispatch_uid='authorisation_old_target'
+)
+def remember_target(sender, instance, raw=False, **kwargs):
+    instance._old_target = None
+    if instance.pk and not raw:
+        instance._old_target = Authorisation.objects.filter(
+            pk=instance.pk,
+        ).values_list('content_type_id', 'target_id').first()
+
+
+@receiver(
+    post_save, sender=Authorisation, dispatch_uid='authorisation_save_access'
+)
+@receiver(
+    post_delete, sender=Authorisation,
+    dispatch_uid='authorisation_delete_access',
+)
+def authorisation_changed(sender, instance, **kwargs):
+    """The access to the target changes, as well as to the previous target
+    of a changed authorisation."""
+    targets = {(instance.content_type_id, instance.target_id)}
+    if getattr(instance, '_old_target', None):
+        targets.add(instance._old_target)
+    for content_type_id, target_id in targets:
+        content_type = ContentType.objects.get_for_id(content_type_id)
+        if (content_type.app_label, content_type.model) in ACCESS_MODELS:
+            update_access(content_type.model_class(), [target_id])
@@ -1,6 +1,3 @@
-import base64
-import hashlib
-import sys
 import time
 
 import rules
@@ -17,6 +14,22 @@ from django.core.urlresolvers import reverse
 from IPy import IP
 from threadlocals.threadlocals import get_current_user
 
+from powerdns.cache import SharedCache
+from powerdns.models.authorisations import (
+    Authorisation,
+    Capability,
+    accessible_ids,
+    authorised_ids,
+    delete_access,
+    grant_access,
+    update_access,
+)
+from powerdns.dnssec import (
+    DNSSEC_METADATA_KINDS,
+    generate_ordername,
+    get_dnssec_profile,
+    invalidate_dnssec_profile,
+)
 from powerdns.utils import (
     AutoPtrOptions,
     is_authorised,
@@ -24,9 +37,13 @@ from powerdns.utils import (
     no_object,
     Owned,
     RecordLike,
+    reverse_labels,
+    reverse_name,
+    split_ipv6,
     TimeTrackable,
     to_reverse,
     validate_domain_name,
+    ZoneTree,
 )
 
 
@@ -44,25 +61,81 @@ RECORD_TYPES = sorted(set(
 ))
 
 
-# If we try get the domain in the global scope then removing it
-# would be unrecoverable. Thus this little helper function.
+can_edit = rules.is_superuser | no_object | is_owner | is_authorised
+can_delete = rules.is_superuser | is_owner | is_authorised
 
-DEFAULT_REVERSE_DOMAIN_TEMPLATE = None
 
+@rules.predicate
+def is_domain_authorised(user, record):
+    """Authorisations of a domain apply to all its records"""
+    user_id = getattr(user, 'pk', None)
+    if not record or record.domain_id is None or user_id is None:
+        return False
+    # The authorisations of a changelist page are prefetched with the domains
+    domain = getattr(
+        record, record._meta.get_field('domain').get_cache_name(), None
+    )
+    if 'authorisations' in getattr(domain, '_prefetched_objects_cache', ()):
+        return is_authorised(user, domain)
+    return Authorisation.objects.filter(
+        authorised_id=user_id,
+        content_type=ContentType.objects.get_for_model(Domain),
+        target_id=record.domain_id,
+    ).exists()
 
-can_edit = rules.is_superuser | no_object | is_owner | is_authorised
-can_delete = rules.is_superuser | is_owner | is_authorised
+
+can_edit_record = can_edit | is_domain_authorised
+can_delete_record = can_delete | is_domain_authorised
 
 
 def get_default_reverse_domain():
     """Returns a default reverse domain."""
-    from powerdns.models.templates import DomainTemplate
-    global DEFAULT_REVERSE_DOMAIN_TEMPLATE
-    if not DEFAULT_REVERSE_DOMAIN_TEMPLATE:
-        DEFAULT_REVERSE_DOMAIN_TEMPLATE = DomainTemplate.objects.get(
-            name=settings.DNSAAS_DEFAULT_REVERSE_DOMAIN_TEMPLATE
-        )
-    return DEFAULT_REVERSE_DOMAIN_TEMPLATE
+    from powerdns.models.templates import get_domain_template
+    return get_domain_template(
+        name=settings.DNSAAS_DEFAULT_REVERSE_DOMAIN_TEMPLATE
+    )
+
+
+def get_reverse_template(domain):
+    """Returns the template for reverse domains created for `domain`."""
+    from powerdns.models.templates import get_domain_template
+    if domain.reverse_template_id is None:
+        return get_default_reverse_domain()
+    return get_domain_template(domain.reverse_template_id)
+
+
+# Domains in a prefix tree, used to find the zones of new records and PTR
+# records. Domain changes invalidate it, all processes load it again.
+_zones = SharedCache('zones')
+
+REVERSE_SUFFIXES = ('.in-addr.arpa', '.ip6.arpa')
+
+
+def load_zones(domains=None):
+    """Return a ZoneTree of a queryset of domains (all by default) from the
+    database."""
+    if domains is None:
+        domains = Domain.objects.all()
+    return ZoneTree(domains.values_list('name', 'pk').iterator())
+
+
+def get_zones():
+    """Return the (cached) ZoneTree of all domains."""
+    return _zones.get('tree', load_zones)
+
+
+def find_zone(name):
+    """Return the name and id of the most specific domain that a record
+    named `name` belongs to, or None if there is no such domain."""
+    return get_zones().find(name)
+
+
+def find_reverse_zone(ip):
+    """Return the name and id of the most specific reverse domain of an
+    address, or None if there is no such domain."""
+    zone = find_zone(reverse_name(ip))
+    if zone is not None and zone[0].endswith(REVERSE_SUFFIXES):
+        return zone
 
 
 try:
@@ -70,17 +143,6 @@ try:
 except AttributeError:
     pass
 
-# http://tools.ietf.org/html/rfc4648#section-7
-if sys.version_info[0] == 2:
-    import string
-    maketrans_func = string.maketrans
-else:
-    maketrans_func = str.maketrans
-b32_trans = maketrans_func(
-    'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567',
-    '0123456789ABCDEFGHIJKLMNOPQRSTUV'
-)
-
 # Validator for the domain names only in RFC-1035
 # PowerDNS considers the whole zone to be invalid if any of the records end
 # with a period so this custom validator is used to catch them
@@ -96,12 +158,18 @@ class SubDomainValidator():
         if rules.is_superuser(user):
             return domain_name
         domain_bits = domain_name.split('.')
-        for i in range(-len(domain_bits), 0):
-            super_domain = '.'.join(domain_bits[i:])
-            try:
-                super_domain = Domain.objects.get(name=super_domain)
-            except Domain.DoesNotExist:
+        # The name itself and all its superdomains, the closest first
+        suffixes = [
+            '.'.join(domain_bits[i:]) for i in range(len(domain_bits))
+        ]
+        existing = {
+            domain.name: domain
+            for domain in Domain.objects.filter(name__in=suffixes)
+        }
+        for super_domain in suffixes:
+            if super_domain not in existing:
                 continue
+            super_domain = existing[super_domain]
             if can_edit(user, super_domain):
                 # ALLOW - this user owns a superdomain
                 return domain_name
@@ -169,6 +237,67 @@ class WithRequests(models.Model):
     request_deletion = request_factory('delete')
 
 
+def under_q(name, include_self=True):
+    """Return a Q object matching objects named `name` or in its subtree
+    (e.g. www.example.com under example.com). The lookups are prefix scans
+    of the indexed reversed_name column."""
+    reversed_name = reverse_labels(name)
+    query = models.Q(reversed_name__startswith=reversed_name + '.')
+    if include_self:
+        query |= models.Q(reversed_name=reversed_name)
+    return query
+
+
+class NamedQuerySet(models.QuerySet):
+
+    def under(self, name):
+        """Filter objects named `name` or in its subtree"""
+        return self.filter(under_q(name))
+
+
+class OwnedQuerySet(models.QuerySet):
+    """Permission filters of domains and records as SQL (see `can_edit`)"""
+
+    # Lookup of objects in domains where anyone may add records
+    unrestricted_lookup = None
+
+    def editable_q(self, user):
+        """Return a Q object matching the objects owned by or authorised to
+        the user"""
+        return models.Q(
+            pk__in=accessible_ids(user, self.model, Capability.CHANGE),
+        )
+
+    def editable_by(self, user):
+        """Filter objects the user may change: all of them for superusers,
+        otherwise the ones owned by or authorised to the user."""
+        if rules.is_superuser(user):
+            return self.all()
+        return self.filter(self.editable_q(user))
+
+    def visible_to(self, user):
+        """Filter objects the user may change and the ones in unrestricted
+        domains."""
+        if rules.is_superuser(user):
+            return self.all()
+        return self.filter(
+            self.editable_q(user) |
+            models.Q(**{self.unrestricted_lookup: True})
+        )
+
+
+class DomainQuerySet(NamedQuerySet, OwnedQuerySet):
+
+    unrestricted_lookup = 'unrestricted'
+
+
+# Domains that hold PTR records
+REVERSE_DOMAINS_Q = (
+    under_q('in-addr.arpa', include_self=False) |
+    under_q('ip6.arpa', include_self=False)
+)
+
+
 class Domain(TimeTrackable, Owned, WithRequests):
     '''
     PowerDNS domains
@@ -185,6 +314,15 @@ class Domain(TimeTrackable, Owned, WithRequests):
         max_length=255,
         validators=[validate_domain_name, SubDomainValidator()]
     )
+    reversed_name = models.CharField(
+        _("reversed name"),
+        max_length=255,
+        blank=True,
+        default='',
+        db_index=True,
+        editable=False,
+        help_text=_("The name with its labels reversed, for subtree lookups"),
+    )
     master = models.CharField(
         _("master"), max_length=128, blank=True, null=True,
     )
@@ -235,6 +373,8 @@ class Domain(TimeTrackable, Owned, WithRequests):
         )
     )
 
+    objects = DomainQuerySet.as_manager()
+
     class Meta:
         db_table = u'domains'
         verbose_name = _("domain")
@@ -249,8 +389,14 @@ class Domain(TimeTrackable, Owned, WithRequests):
     def save(self, *args, **kwargs):
         # This save can trigger creating some templated records.
         # So we do it atomically
+        self.reversed_name = reverse_labels(self.name)
         with transaction.atomic():
             super(Domain, self).save(*args, **kwargs)
+        _zones.after_transaction()
+
+    def delete(self, *args, **kwargs):
+        super(Domain, self).delete(*args, **kwargs)
+        _zones.after_transaction()
 
     def get_soa(self):
         """Returns the SOA record for this domain"""
@@ -291,6 +437,54 @@ rules.add_perm('powerdns.change_domain', can_edit)
 rules.add_perm('powerdns.delete_domain', can_delete)
 
 
+# Fields with the numeric forms of IP addresses
+NUMBER_FIELDS = {'number', 'number6_high', 'number6_low'}
+
+
+class RecordQuerySet(NamedQuerySet, OwnedQuerySet):
+
+    unrestricted_lookup = 'domain__unrestricted'
+
+    def editable_q(self, user):
+        # Records of the domains the user has been authorised to as well
+        return super().editable_q(user) | models.Q(
+            domain__in=authorised_ids(user, Domain),
+        )
+
+    def in_network(self, network):
+        """Filter A and AAAA records with addresses in the given network
+        (like '192.168.0.0/16' or '2001:db8::/48'), using indexes."""
+        network = IP(network)
+        first, last = network.int(), network.broadcast().int()
+        if network.version() == 4:
+            return self.filter(number__range=(first, last))
+        (first_high, first_low), (last_high, last_low) = (
+            split_ipv6(first), split_ipv6(last)
+        )
+        if first_high == last_high:
+            return self.filter(
+                number6_high=first_high,
+                number6_low__range=(first_low, last_low),
+            )
+        # Networks larger than /64 contain all possible low bits
+        return self.filter(number6_high__range=(first_high, last_high))
+
+    def count_addresses(self):
+        """Count the distinct addresses of A and AAAA records"""
+        return self.filter(
+            type__in=['A', 'AAAA'],
+        ).order_by().values(*sorted(NUMBER_FIELDS)).distinct().count()
+
+    def delete(self):
+        from powerdns.serials import coalesce_serials
+        # Update the SOA of each zone once, not for every deleted record
+        with coalesce_serials():
+            return super().delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class Record(TimeTrackable, Owned, RecordLike, WithRequests):
     '''
     PowerDNS DNS records
@@ -311,6 +505,15 @@ class Record(TimeTrackable, Owned, RecordLike, WithRequests):
                     " fully qualified - it is not relative to the name of the"
                     " domain!"),
     )
+    reversed_name = models.CharField(
+        _("reversed name"),
+        max_length=255,
+        blank=True,
+        default='',
+        db_index=True,
+        editable=False,
+        help_text=_("The name with its labels reversed, for subtree lookups"),
+    )
     type = models.CharField(
         _("type"), max_length=6, blank=True, null=True,
         choices=RECORD_TYPE, help_text=_("Record qtype"),
@@ -324,6 +527,14 @@ class Record(TimeTrackable, Owned, RecordLike, WithRequests):
         _("IP number"), null=True, blank=True, default=None, editable=False,
         db_index=True
     )
+    number6_high = models.BigIntegerField(
+        _("IPv6 number (high bits)"), null=True, blank=True, default=None,
+        editable=False,
+    )
+    number6_low = models.BigIntegerField(
+        _("IPv6 number (low bits)"), null=True, blank=True, default=None,
+        editable=False,
+    )
     ttl = models.PositiveIntegerField(
         _("TTL"), blank=True, null=True, default=3600,
         help_text=_("TTL in seconds"),
@@ -383,10 +594,13 @@ class Record(TimeTrackable, Owned, RecordLike, WithRequests):
         default=AutoPtrOptions.ALWAYS,
     )
 
+    objects = RecordQuerySet.as_manager()
+
     class Meta:
         db_table = u'records'
         ordering = ('name', 'type')
         unique_together = ('name', 'type', 'content')
+        index_together = ('number6_high', 'number6_low')
         verbose_name = _("record")
         verbose_name_plural = _("records")
 
@@ -402,67 +616,10 @@ class Record(TimeTrackable, Owned, RecordLike, WithRequests):
         Check which DNSSEC Mode the domain is in and fill the `ordername`
         field depending on the mode.
         '''
-        cryptokey = CryptoKey.objects.filter(domain=self.domain)
-        if not cryptokey.count():
+        profile = get_dnssec_profile(self.domain_id)
+        if not profile.signed:
             return None
-        metadata = DomainMetadata.objects.filter(domain=self.domain)
-        nsec3param = metadata.filter(kind='NSEC3PARAM')
-        nsec3narrow = metadata.filter(kind='NSEC3NARROW')
-        if nsec3param.count():
-            if nsec3narrow.count():
-                # When running in NSEC3 'Narrow' mode, the ordername field is
-                # ignored and best left empty.
-                return ''
-            return self._generate_ordername_nsec3(nsec3param[0])
-        return self._generate_ordername_nsec()
-
-    def _generate_ordername_nsec(self):
-        '''
-        In 'NSEC' mode, it should contain the relative part of a domain name,
-        in reverse order, with dots replaced by spaces
-        '''
-        domain_words = self.domain.name.split('.')
-        host_words = self.name.split('.')
-        relative_word_count = len(host_words) - len(domain_words)
-        relative_words = host_words[0:relative_word_count]
-        ordername = ' '.join(relative_words[::-1])
-        return ordername
-
-    def _generate_ordername_nsec3(self, nsec3param):
-        '''
-        In 'NSEC3' non-narrow mode, the ordername should contain a lowercase
-        base32hex encoded representation of the salted & iterated hash of the
-        full record name.  "pdnssec hash-zone-record zone record" can be used
-        to calculate this hash.
-        '''
-        try:
-            algo, flags, iterations, salt = nsec3param.content.split()
-            if algo != '1':
-                raise ValueError("Incompatible hash algorithm.")
-            if flags != '1':
-                raise ValueError("Incompatible flags.")
-            salt = salt.decode('hex')
-            # convert the record name to the DNSSEC canonical form, e.g.
-            # a format suitable for digesting in hashes
-            record_name = '%s.' % self.name.lower().rstrip('.')
-            parts = ["%s%s" % (chr(len(x)), x) for x in record_name.split('.')]
-            record_name = ''.join(parts)
-        except (ValueError, TypeError, AttributeError):
-            return None  # incompatible input
-        record_name = self._sha1(record_name, salt)
-        i = 0
-        while i < int(iterations):
-            record_name = self._sha1(record_name, salt)
-            i += 1
-        result = base64.b32encode(record_name)
-        result = result.translate(b32_trans)
-        return result.lower()
-
-    def _sha1(self, value, salt):
-        s = hashlib.sha1()
-        s.update(value)
-        s.update(salt)
-        return s.digest()
+        return generate_ordername(profile, self.domain.name, self.name)
 
     def force_case(self):
         """Force the name and content case to upper and lower respectively"""
@@ -471,90 +628,114 @@ class Record(TimeTrackable, Owned, RecordLike, WithRequests):
         if self.type:
             self.type = self.type.upper()
 
-    def validate_for_conflicts(self):
-        """Ensure this record doesn't conflict with other records."""
-        def check_unique(comment, **kwargs):
-            conflicting = Record.objects.filter(**kwargs)
-            if self.pk is not None:
-                conflicting = conflicting.exclude(pk=self.pk)
-            if conflicting:
-                raise ValidationError(comment.format(
-                    ', '.join(str(record.id) for record in conflicting)
-                ))
-        if self.type == 'CNAME':
-            check_unique(
-                'Cannot create CNAME record. Following conflicting '
-                'records exist: {}',
-                name=self.name,
+    def get_record_pk(self):
+        return self.pk
+
+    def update_numbers(self):
+        """Set the numeric forms of the address of an A or AAAA record"""
+        self.number = IP(self.content).int() if self.type == 'A' else None
+        if self.type == 'AAAA':
+            self.number6_high, self.number6_low = split_ipv6(
+                IP(self.content).int()
             )
         else:
-            check_unique(
-                'Cannot create a record. Following conflicting CNAME'
-                'record exists: {}',
-                type='CNAME',
-                name=self.name,
-            )
+            self.number6_high = self.number6_low = None
 
     def save(self, *args, **kwargs):
+        changed = self.get_changed_fields()
+        # New objects (including loaded ones with their pk reset) are saved
+        # whole
+        if (
+            kwargs.get('force_insert') or kwargs.get('update_fields') or
+            self.pk is None or self._state.adding
+        ):
+            changed = None
         self.change_date = int(time.time())
-        self.ordername = self._generate_ordername()
-        if self.type == 'A':
-            self.number = IP(self.content).int()
+        derived = {'change_date', 'modified'}
+        if changed is None or changed & {'name', 'domain'}:
+            self.ordername = self._generate_ordername()
+            self.reversed_name = reverse_labels(self.name)
+            derived.update(['ordername', 'reversed_name'])
+        if changed is None or changed & {'type', 'content'}:
+            self.update_numbers()
+            derived.update(NUMBER_FIELDS)
+        if changed is not None:
+            # Only write what has changed
+            kwargs['update_fields'] = changed | derived
         super(Record, self).save(*args, **kwargs)
 
     def delete_ptr(self):
         Record.objects.filter(depends_on=self).delete()
 
     def create_ptr(self):
-        """Creates a PTR record for A record creating a domain if necessary."""
+        """Creates or updates the PTR record for A record creating a domain
+        if necessary. An existing PTR keeps its id and is only saved if it
+        has to change."""
         if self.type != 'A':
             raise ValueError(_('Creating PTR only for A records'))
-        domain_name, number = to_reverse(self.content)
-        if self.auto_ptr == AutoPtrOptions.ALWAYS:
-            domain, created = Domain.objects.get_or_create(
-                name=domain_name,
+        if self.auto_ptr not in (
+            AutoPtrOptions.ALWAYS, AutoPtrOptions.ONLY_IF_DOMAIN
+        ):
+            return
+        zone = find_reverse_zone(self.content)
+        if zone is not None:
+            domain_id = zone[1]
+        elif self.auto_ptr != AutoPtrOptions.ALWAYS:
+            return
+        else:
+            # New reverse domains are created for /24 networks
+            domain_id = Domain.objects.get_or_create(
+                name=to_reverse(self.content)[0],
                 defaults={
-                    'template': (
-                        self.domain.reverse_template or
-                        get_default_reverse_domain()
-                    ),
+                    'template': get_reverse_template(self.domain),
                     'type': self.domain.type,
                 }
-            )
-        elif self.auto_ptr == AutoPtrOptions.ONLY_IF_DOMAIN:
-            try:
-                domain = Domain.objects.get(name=domain_name)
-            except Domain.DoesNotExist:
-                return
-        else:
+            )[0].pk
+
+        values = {
+            'domain_id': domain_id,
+            'name': reverse_name(self.content),
+            'content': self.name,
+            'owner_id': self.owner_id,
+        }
+        ptrs = list(Record.objects.filter(depends_on=self).order_by('pk'))
+        if not ptrs:
+            Record.objects.create(type='PTR', depends_on=self, **values)
             return
-
-        self.delete_ptr()
-        Record.objects.create(
-            type='PTR',
-            domain=domain,
-            name='.'.join([number, domain_name]),
-            content=self.name,
-            depends_on=self,
-            owner=self.owner,
-        )
+        ptr = ptrs.pop(0)
+        if ptrs:
+            Record.objects.filter(pk__in=[extra.pk for extra in ptrs]).delete()
+        for attname, value in values.items():
+            setattr(ptr, attname, value)
+        if ptr.get_changed_fields():
+            ptr.save()
 
 rules.add_perm('powerdns.add_record', rules.is_authenticated)
-rules.add_perm('powerdns.change_record', can_edit)
-rules.add_perm('powerdns.delete_record', can_delete)
+rules.add_perm('powerdns.change_record', can_edit_record)
+rules.add_perm('powerdns.delete_record', can_delete_record)
 
 
 # When we delete a record, the zone changes, but there no change_date is
-# updated. We update the SOA record, so the serial changes
+# updated. We update the SOA record, so the serial changes. Saved records
+# mark their zones too, so that SOA updates are coalesced the same way.
+@receiver(post_save, sender=Record, dispatch_uid='record_save_serial')
 @receiver(post_delete, sender=Record, dispatch_uid='record_update_serial')
-def update_serial(sender, instance, **kwargs):
-    soa = instance.domain.get_soa()
-    if soa:
-        soa.save()
+def update_serial(sender, instance, signal, **kwargs):
+    from powerdns.serials import mark_dirty
+    if instance.type == 'SOA' and signal is post_save:
+        # A saved SOA has already got a new change_date
+        return
+    mark_dirty(instance.domain_id, instance.get_original_value('domain_id'))
+
+
+# Fields of an A record that its PTR record depends on
+PTR_SOURCE_FIELDS = {'type', 'name', 'content', 'auto_ptr', 'owner', 'domain'}
 
 
 @receiver(post_save, sender=Record, dispatch_uid='record_create_ptr')
-def create_ptr(sender, instance, **kwargs):
+def create_ptr(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not PTR_SOURCE_FIELDS & update_fields:
+        return
     if instance.auto_ptr == AutoPtrOptions.NEVER or instance.type != 'A':
         instance.delete_ptr()
         return
@@ -614,3 +795,67 @@ class CryptoKey(TimeTrackable):
 
     def __str__(self):
         return self.domain
+
+
+def _dnssec_changed(*domain_ids):
+    from powerdns.rectify import schedule_rectify
+    invalidate_dnssec_profile(*domain_ids)
+    schedule_rectify(*domain_ids)
+
+
+@receiver(post_save, sender=CryptoKey, dispatch_uid='cryptokey_save_dnssec')
+@receiver(
+    post_delete, sender=CryptoKey, dispatch_uid='cryptokey_delete_dnssec'
+)
+def cryptokey_changed(sender, instance, **kwargs):
+    """Keys decide if a domain is signed at all. The domain a key belonged to
+    before the save changes too."""
+    _dnssec_changed(
+        instance.domain_id,
+        instance.get_original_value('domain_id'),
+    )
+
+
+@receiver(
+    post_save, sender=DomainMetadata, dispatch_uid='metadata_save_dnssec'
+)
+@receiver(
+    post_delete, sender=DomainMetadata, dispatch_uid='metadata_delete_dnssec'
+)
+def metadata_changed(sender, instance, **kwargs):
+    """Only NSEC3 metadata affects the DNSSEC profile."""
+    if instance.kind in DNSSEC_METADATA_KINDS:
+        _dnssec_changed(instance.domain_id)
+    if instance.get_original_value('kind') in DNSSEC_METADATA_KINDS:
+        _dnssec_changed(instance.get_original_value('domain_id'))
+
+
+@receiver(post_delete, sender=Domain, dispatch_uid='domain_delete_dnssec')
+def forget_dnssec_profile(sender, instance, **kwargs):
+    invalidate_dnssec_profile(instance.pk)
+
+
+@receiver(post_save, sender=Domain, dispatch_uid='domain_save_zones')
+@receiver(post_delete, sender=Domain, dispatch_uid='domain_delete_zones')
+def update_zones(sender, instance, signal, **kwargs):
+    original_name = instance.get_original_value('name')
+    if signal is post_save and not kwargs.get('created') and (
+        instance.name == original_name
+    ):
+        return
+    _zones.invalidate('tree')
+
+
+@receiver(post_save, sender=Domain, dispatch_uid='domain_save_access')
+@receiver(post_save, sender=Record, dispatch_uid='record_save_access')
+def owner_changed(sender, instance, created, **kwargs):
+    if created:
+        grant_access(sender, {instance.pk: instance.owner_id})
+    elif instance.owner_id != instance.get_original_value('owner_id'):
+        update_access(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=Domain, dispatch_uid='domain_delete_access')
+@receiver(post_delete, sender=Record, dispatch_uid='record_delete_access')
+def forget_access(sender, instance, **kwargs):
+    delete_access(sender, [instance.pk])
@@ -303,8 +303,7 @@ class RecordRequest(ChangeCreateRequest, RecordLike):
     view = 'accept_record'
 
     def get_record_pk(self):
-        if self.record:
-            return self.record.pk
+        return self.record_id
 
     def __str__(self):
         if self.target_prio is not None:
@@ -1,19 +1,69 @@
 """Models and signal subscriptions for templating system"""
 
+from collections import defaultdict
+
 from django.core.urlresolvers import reverse
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 from dj.choices.fields import ChoiceField
 
+from powerdns.cache import SharedCache
 from powerdns.models.powerdns import Domain, Record
 from powerdns.utils import AutoPtrOptions
 
 
+# There are few templates and they are read whenever domains and reverse
+# domains are created, so all of them are cached under a single key.
+_templates = SharedCache('templates')
+
+
+class TemplateSet(object):
+    """All domain templates by id and name and their record templates"""
+
+    def __init__(self, domain_templates, record_templates):
+        self.by_id = {template.pk: template for template in domain_templates}
+        self.by_name = {
+            template.name: template for template in domain_templates
+        }
+        self.records = defaultdict(list)
+        for template in record_templates:
+            template.domain_template = self.by_id[template.domain_template_id]
+            self.records[template.domain_template_id].append(template)
+
+
+def get_templates():
+    """Return the (cached) TemplateSet"""
+    return _templates.get('all', lambda: TemplateSet(
+        list(DomainTemplate.objects.all()),
+        list(RecordTemplate.objects.order_by('pk')),
+    ))
+
+
+def get_domain_template(pk=None, name=None):
+    """Return a cached domain template by its id or name. Raises
+    DomainTemplate.DoesNotExist if there is no such template."""
+    templates = get_templates()
+    if pk is not None:
+        template = templates.by_id.get(int(pk))
+    else:
+        template = templates.by_name.get(name)
+    if template is None:
+        raise DomainTemplate.DoesNotExist(
+            'DomainTemplate matching query does not exist.'
+        )
+    return template
+
+
+def get_record_templates(domain_template_id):
+    """Return the cached record templates of a domain template"""
+    return list(get_templates().records.get(domain_template_id, []))
+
+
 class DomainTemplateManager(models.Manager):
     def get_by_natural_key(self, name):
-        return self.get(name=name)
+        return get_domain_template(name=name)
 
 
 class DomainTemplate(models.Model):
@@ -155,22 +205,41 @@ class RecordTemplate(models.Model):
 )
 def update_templated_records(sender, instance, **kwargs):
     """Deletes and creates records appropriately to the template"""
-    if instance.template is None:
+    if instance.template_id is None:
         return
     instance.record_set.exclude(
         template__isnull=True
     ).exclude(
-        template__domain_template=instance.template
+        template__domain_template=instance.template_id
     ).delete()
     existing_template_ids = set(
         instance.record_set.exclude(
             template__isnull=True
         ).values_list('template__id', flat=True)
     )
-    for template in instance.template.recordtemplate_set.exclude(
-        pk__in=existing_template_ids,
-    ):
-        template.create_record(instance)
+    for template in get_record_templates(instance.template_id):
+        if template.pk not in existing_template_ids:
+            template.create_record(instance)
+
+
+@receiver(
+    post_save, sender=DomainTemplate, dispatch_uid='domain_template_save_cache'
+)
+@receiver(
+    post_delete,
+    sender=DomainTemplate,
+    dispatch_uid='domain_template_delete_cache',
+)
+@receiver(
+    post_save, sender=RecordTemplate, dispatch_uid='record_template_save_cache'
+)
+@receiver(
+    post_delete,
+    sender=RecordTemplate,
+    dispatch_uid='record_template_delete_cache',
+)
+def forget_templates(sender, instance, **kwargs):
+    _templates.invalidate('all')
 
 
 @receiver(
@@ -0,0 +1,73 @@
+"""NSEC3 hashing of domain names (RFC 5155)"""
+
+import base64
+import hashlib
+from functools import lru_cache
+
+
+# Number of (name, salt, iterations) hashes remembered
+CACHE_SIZE = 65536
+
+# http://tools.ietf.org/html/rfc4648#section-7
+b32_to_b32hex = bytes.maketrans(
+    b'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567',
+    b'0123456789abcdefghijklmnopqrstuv',
+)
+
+
+def parse_salt(salt):
+    """
+    Convert a hex salt as found in NSEC3PARAM to bytes ('-' is no salt)
+
+    >>> parse_salt('AABBccdd')
+    b'\\xaa\\xbb\\xcc\\xdd'
+    >>> parse_salt('-')
+    b''
+    """
+    if salt in ('', '-'):
+        return b''
+    return bytes.fromhex(salt)
+
+
+def to_wire(name):
+    """
+    Convert a domain name to its canonical wire format
+
+    >>> to_wire('www.Example.com')
+    b'\\x03www\\x07example\\x03com\\x00'
+    """
+    name = name.lower().rstrip('.')
+    if not name:
+        return b'\x00'
+    return b''.join(
+        bytes((len(label),)) + label
+        for label in name.encode('ascii').split(b'.')
+    ) + b'\x00'
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _hash(name, salt, iterations):
+    sha1 = hashlib.sha1
+    digest = sha1(to_wire(name) + salt).digest()
+    for _ in range(iterations):
+        digest = sha1(digest + salt).digest()
+    return base64.b32encode(digest).translate(b32_to_b32hex).decode('ascii')
+
+
+def nsec3_hash(name, salt, iterations):
+    """Return the lowercase base32hex NSEC3 hash of a name, as printed by
+    `pdnssec hash-zone-record`. `salt` is given in hex."""
+    return _hash(name.lower().rstrip('.'), parse_salt(salt), iterations)
+
+
+def nsec3_hash_many(names, salt, iterations):
+    """Return a list of NSEC3 hashes of many names using the same salt and
+    iteration count."""
+    salt = parse_salt(salt)
+    return [
+        _hash(name.lower().rstrip('.'), salt, iterations) for name in names
+    ]
+
+
+cache_info = _hash.cache_info
+cache_clear = _hash.cache_clear
@@ -0,0 +1,138 @@
+"""Bulk recomputation of DNSSEC ordernames (like `pdnssec rectify-zone`)"""
+
+import logging
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, models, router, transaction
+
+from powerdns.dnssec import (
+    generate_ordernames,
+    get_dnssec_profile,
+    invalidate_dnssec_profile,
+)
+from powerdns.models.powerdns import Domain, Record
+from powerdns.utils import chunks, on_commit
+
+
+logger = logging.getLogger(__name__)
+
+# Number of records updated by a single UPDATE statement. Every record costs
+# up to three query parameters, which must stay below SQLite's limit of 999.
+BATCH_SIZE = 250
+
+_executor = None
+
+
+def rectify_zone(domain_id):
+    """Recompute the ordernames of all records in a domain. Returns the
+    number of records that were changed."""
+    try:
+        zone_name = Domain.objects.values_list(
+            'name', flat=True
+        ).get(pk=domain_id)
+    except Domain.DoesNotExist:
+        return 0
+    profile = get_dnssec_profile(domain_id)
+    pks, names, ordernames = [], [], []
+    for pk, name, ordername in Record.objects.filter(
+        domain_id=domain_id,
+    ).values_list('pk', 'name', 'ordername').iterator():
+        pks.append(pk)
+        names.append(name)
+        ordernames.append(ordername)
+    changes = {
+        pk: new_ordername
+        for pk, ordername, new_ordername in zip(
+            pks, ordernames, generate_ordernames(profile, zone_name, names)
+        )
+        if new_ordername != ordername
+    }
+    with transaction.atomic(using=router.db_for_write(Record)):
+        update_ordernames(changes)
+    return len(changes)
+
+
+def update_ordernames(changes):
+    """Write a {record id: ordername} mapping with batched UPDATEs."""
+    by_ordername = defaultdict(list)
+    for pk, ordername in changes.items():
+        by_ordername[ordername].append(pk)
+    unique = []
+    for ordername, pks in by_ordername.items():
+        if len(pks) == 1:
+            unique.append((pks[0], ordername))
+            continue
+        # Unsigned and NSEC3 narrow zones share one value for many records
+        for batch in chunks(pks, BATCH_SIZE):
+            Record.objects.filter(pk__in=batch).update(ordername=ordername)
+    for batch in chunks(unique, BATCH_SIZE):
+        Record.objects.filter(
+            pk__in=[pk for pk, _ in batch]
+        ).update(ordername=models.Case(
+            *[
+                models.When(pk=pk, then=models.Value(ordername))
+                for pk, ordername in batch
+            ],
+            output_field=models.CharField()
+        ))
+
+
+def _rectify_in_worker(domain_id):
+    try:
+        return domain_id, rectify_zone(domain_id)
+    finally:
+        connections.close_all()
+
+
+def rectify_zones(domain_ids, processes=1):
+    """Rectify many domains, in a pool of `processes` worker processes if
+    there is more than one. Returns a {domain id: changed records} dict."""
+    domain_ids = list(domain_ids)
+    if processes <= 1 or len(domain_ids) <= 1:
+        return {
+            domain_id: rectify_zone(domain_id) for domain_id in domain_ids
+        }
+    # Forked workers mustn't share the database connections of the parent
+    connections.close_all()
+    pool = multiprocessing.Pool(processes)
+    try:
+        return dict(pool.imap_unordered(_rectify_in_worker, domain_ids))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _rectify_in_background(domain_ids):
+    try:
+        # A profile might have been cached from before the commit
+        invalidate_dnssec_profile(*domain_ids)
+        rectify_zones(domain_ids)
+    except Exception:
+        logger.exception('Rectifying domains %s failed', domain_ids)
+    finally:
+        connections.close_all()
+
+
+def schedule_rectify(*domain_ids):
+    """Rectify domains after the current transaction is committed. This is
+    done in a background thread unless DNSAAS_RECTIFY_IN_BACKGROUND is False
+    or Django is too old to run code on commit."""
+    global _executor
+    domain_ids = [domain_id for domain_id in domain_ids if domain_id]
+    if not domain_ids:
+        return
+    if not (
+        getattr(settings, 'DNSAAS_RECTIFY_IN_BACKGROUND', True) and
+        hasattr(transaction, 'on_commit')
+    ):
+        rectify_zones(domain_ids)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1)
+    on_commit(
+        lambda: _executor.submit(_rectify_in_background, domain_ids),
+        using=router.db_for_write(Record),
+    )
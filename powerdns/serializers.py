@@ -1,6 +1,8 @@
 """Serializer classes for DNSaaS API"""
 
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.translation import ugettext_lazy as _
 from powerdns.models import (
     CryptoKey,
     Domain,
@@ -14,8 +16,10 @@ from rest_framework.serializers import(
     HyperlinkedModelSerializer,
     HyperlinkedRelatedField,
     SlugRelatedField,
+    ValidationError,
 )
 from powerdns.utils import DomainForRecordValidator
+from powerdns.validation import validate_content
 
 
 class OwnerSerializer(HyperlinkedModelSerializer):
@@ -45,8 +49,49 @@ class RecordSerializer(OwnerSerializer):
         queryset=Domain.objects.all(),
         view_name='domain-detail',
         validators=[DomainForRecordValidator()],
+        required=False,
+        help_text=_(
+            'The most specific managed domain of the name is used if the '
+            'domain is not given'
+        ),
     )
 
+    def validate(self, attrs):
+        if self.instance is None and attrs.get('domain') is None:
+            attrs['domain'] = self.find_domain(attrs.get('name'))
+        type_ = attrs.get('type', getattr(self.instance, 'type', None))
+        content = attrs.get(
+            'content', getattr(self.instance, 'content', None)
+        ) or ''
+        message = validate_content(type_, content)
+        if message is not None:
+            raise ValidationError({'content': [message]})
+        return super().validate(attrs)
+
+    def find_domain(self, name):
+        """Return the domain of a new record named `name`. The most specific
+        domain is found with a single query, the one that the domain field
+        would make."""
+        labels = name.lower().rstrip('.').split('.') if name else []
+        # The name itself and all its superdomains, the closest first
+        suffixes = ['.'.join(labels[i:]) for i in range(len(labels))]
+        existing = {
+            domain.name: domain
+            for domain in Domain.objects.filter(name__in=suffixes)
+        } if suffixes else {}
+        domain = next(
+            (existing[suffix] for suffix in suffixes if suffix in existing),
+            None,
+        )
+        if domain is None:
+            raise ValidationError({'domain': [
+                _('There is no domain for {}').format(name)
+            ]})
+        try:
+            return DomainForRecordValidator()(domain)
+        except DjangoValidationError as e:
+            raise ValidationError({'domain': e.messages})
+
 
 class CryptoKeySerializer(HyperlinkedModelSerializer):
 
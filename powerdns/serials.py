@@ -0,0 +1,83 @@
+"""Coalescing updates of SOA serials.
+
+Every change to a zone should change the serial in its SOA record. Instead
+of saving the SOA for each changed record, zones are marked dirty and their
+SOA records are updated once - when the transaction is committed, or at the
+end of a `coalesce_serials()` block.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from powerdns.models.powerdns import Record
+from powerdns.rectify import BATCH_SIZE
+from powerdns.utils import chunks
+
+
+_local = threading.local()
+
+
+def bump_serials(domain_ids):
+    """Update the SOA records of domains, so their serials change."""
+    for batch in chunks(domain_ids, BATCH_SIZE):
+        Record.objects.filter(
+            type='SOA', domain_id__in=batch,
+        ).update(change_date=int(time.time()), modified=timezone.now())
+
+
+@contextmanager
+def coalesce_serials():
+    """Defer updating the serials of dirty zones until the end of the block.
+    Blocks can be nested, the outermost one does the update."""
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+    _local.pending = pending = set()
+    try:
+        yield
+    finally:
+        _local.pending = None
+    bump_serials(pending)
+
+
+def _flush_on_commit(alias):
+    bump_serials(_local.on_commit.pop(alias, ()))
+
+
+def _pending_on_commit(alias):
+    """Return the set of domains that will be updated when the current
+    transaction is committed. A hook is registered on every call. The first
+    one to run updates all the domains and the rest find nothing left to do.
+    If the transaction is rolled back, Django drops its hooks. Its domains
+    are then updated when the next transaction commits, which is harmless."""
+    on_commit = getattr(_local, 'on_commit', None)
+    if on_commit is None:
+        on_commit = _local.on_commit = {}
+    transaction.on_commit(partial(_flush_on_commit, alias), using=alias)
+    return on_commit.setdefault(alias, set())
+
+
+def mark_dirty(*domain_ids):
+    """Mark zones as changed. Their serials are updated at the end of the
+    current `coalesce_serials()` block, on commit of the current transaction
+    or (if neither applies, or Django is too old to run code on commit)
+    immediately."""
+    domain_ids = {domain_id for domain_id in domain_ids if domain_id}
+    if not domain_ids:
+        return
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        connection = connections[router.db_for_write(Record)]
+        if (
+            not connection.in_atomic_block or
+            not hasattr(transaction, 'on_commit')
+        ):
+            bump_serials(domain_ids)
+            return
+        pending = _pending_on_commit(connection.alias)
+    pending.update(domain_ids)
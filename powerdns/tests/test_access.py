@@ -0,0 +1,213 @@
+"""Tests for the maintained Access rows"""
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from powerdns.bulk import bulk_create_records, delete_domain
+from powerdns.models.authorisations import (
+    Access,
+    Authorisation,
+    Capability,
+    accessible_ids,
+)
+from powerdns.models.powerdns import Domain, Record
+from powerdns.tests.utils import DomainFactory, RecordFactory, user_client
+from powerdns.utils import AutoPtrOptions
+
+
+class TestAccess(TestCase):
+    """Access rows follow owners and authorisations"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            'owner', 'owner@example.com', 'password'
+        )
+        self.user = User.objects.create_user(
+            'user', 'user@example.com', 'password'
+        )
+        self.domain = DomainFactory(
+            name='example.com',
+            owner=self.owner,
+            template=None,
+            reverse_template=None,
+        )
+        self.record = RecordFactory(
+            domain=self.domain,
+            name='www.example.com',
+            type='A',
+            content='192.168.1.1',
+            owner=self.owner,
+            auto_ptr=AutoPtrOptions.NEVER,
+        )
+
+    def editable(self, user, model):
+        return set(model.objects.filter(
+            pk__in=accessible_ids(user, model, Capability.CHANGE),
+        ).values_list('name', flat=True))
+
+    def test_owner(self):
+        """Owners get access to new objects and lose it to new owners"""
+        self.assertEqual(self.editable(self.owner, Domain), {'example.com'})
+        self.assertEqual(
+            self.editable(self.owner, Record), {'www.example.com'}
+        )
+        self.record.owner = self.user
+        self.record.save()
+        self.assertEqual(self.editable(self.owner, Record), set())
+        self.assertEqual(self.editable(self.user, Record), {'www.example.com'})
+        # Only the domain is left to the owner
+        self.assertEqual(Access.objects.filter(user=self.owner).count(), 2)
+
+    def test_authorisations(self):
+        """Authorised users get access until the authorisation is gone"""
+        authorisation = Authorisation.objects.create(
+            owner=self.owner, authorised=self.user, target=self.domain,
+        )
+        self.assertEqual(self.editable(self.user, Domain), {'example.com'})
+        authorisation.target = self.record
+        authorisation.save()
+        self.assertEqual(self.editable(self.user, Domain), set())
+        self.assertEqual(self.editable(self.user, Record), {'www.example.com'})
+        authorisation.delete()
+        self.assertEqual(self.editable(self.user, Record), set())
+        self.assertEqual(
+            self.editable(self.owner, Record), {'www.example.com'}
+        )
+
+    def test_bulk(self):
+        """Bulk created and deleted records keep their Access rows"""
+        DomainFactory(
+            name='1.168.192.in-addr.arpa',
+            template=None,
+            reverse_template=None,
+        )
+        bulk_create_records([Record(
+            domain=self.domain,
+            name='{}.example.com'.format(name),
+            type='A',
+            content='192.168.1.{}'.format(i),
+            owner=self.owner,
+            auto_ptr=AutoPtrOptions.ALWAYS,
+        ) for i, name in enumerate(['a', 'b'], 2)])
+        self.assertEqual(
+            self.editable(self.owner, Record),
+            {
+                'www.example.com', 'a.example.com', 'b.example.com',
+                '2.1.168.192.in-addr.arpa', '3.1.168.192.in-addr.arpa',
+            },
+        )
+        delete_domain(self.domain)
+        self.assertFalse(Access.objects.exists())
+
+
+class TestAccessFilters(TestCase):
+    """Permission filters of domains and records in the database"""
+
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(
+            'superuser', 'superuser@example.com', 'password'
+        )
+        self.user = User.objects.create_user(
+            'user', 'user@example.com', 'password'
+        )
+        self.user.is_staff = True
+        self.user.save()
+        for name, owner, unrestricted in [
+            ('su.example.com', self.superuser, False),
+            ('u.example.com', self.user, False),
+            ('unrestricted.example.com', self.superuser, True),
+        ]:
+            domain = DomainFactory(
+                name=name,
+                owner=owner,
+                unrestricted=unrestricted,
+                template=None,
+                reverse_template=None,
+            )
+            RecordFactory(
+                domain=domain,
+                name='www.{}'.format(name),
+                type='TXT',
+                content='text',
+                owner=owner,
+                auto_ptr=AutoPtrOptions.NEVER,
+            )
+        self.authorised = Record.objects.get(name='www.su.example.com')
+        Authorisation.objects.create(
+            owner=self.superuser, authorised=self.user,
+            target=self.authorised,
+        )
+
+    def names(self, queryset):
+        return sorted(queryset.values_list('name', flat=True))
+
+    def test_querysets(self):
+        """Owned, authorised and unrestricted objects are filtered"""
+        self.assertEqual(
+            self.names(Domain.objects.editable_by(self.user)),
+            ['u.example.com'],
+        )
+        self.assertEqual(
+            self.names(Domain.objects.visible_to(self.user)),
+            ['u.example.com', 'unrestricted.example.com'],
+        )
+        self.assertEqual(
+            self.names(Record.objects.editable_by(self.user)),
+            ['www.su.example.com', 'www.u.example.com'],
+        )
+        self.assertEqual(
+            self.names(Record.objects.visible_to(self.user)),
+            [
+                'www.su.example.com', 'www.u.example.com',
+                'www.unrestricted.example.com',
+            ],
+        )
+        self.assertEqual(
+            Record.objects.editable_by(self.superuser).count(), 3
+        )
+
+    def test_domain_authorisations(self):
+        """Records of domains the user is authorised to are editable"""
+        Authorisation.objects.create(
+            owner=self.superuser, authorised=self.user,
+            target=Domain.objects.get(name='unrestricted.example.com'),
+        )
+        self.assertEqual(
+            self.names(Record.objects.editable_by(self.user)),
+            [
+                'www.su.example.com', 'www.u.example.com',
+                'www.unrestricted.example.com',
+            ],
+        )
+
+    def test_api(self):
+        """Domains and records are filtered by ?editable=1"""
+        client = user_client(self.user)
+        response = client.get(reverse('record-list'), {'editable': '1'})
+        self.assertEqual(
+            sorted(result['name'] for result in response.data['results']),
+            ['www.su.example.com', 'www.u.example.com'],
+        )
+        response = client.get(reverse('domain-list'), {'editable': 'true'})
+        self.assertEqual(
+            [result['name'] for result in response.data['results']],
+            ['u.example.com'],
+        )
+
+    def test_admin(self):
+        """The admin changelists are filtered by access"""
+        self.client.login(username='user', password='password')
+        response = self.client.get(
+            reverse('admin:powerdns_record_changelist'),
+            {'access': 'visible'},
+        )
+        self.assertEqual(
+            sorted(
+                record.name for record in response.context['cl'].result_list
+            ),
+            [
+                'www.su.example.com', 'www.u.example.com',
+                'www.unrestricted.example.com',
+            ],
+        )
@@ -1,10 +1,22 @@
 """Tests for auto_ptr feature"""
 
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.six import StringIO
 
-from powerdns.models.powerdns import Domain, Record
+from powerdns.auto_ptr import reconcile_ptrs
+from powerdns.cache import SharedCache
+from powerdns.models.powerdns import (
+    Domain,
+    Record,
+    find_reverse_zone,
+    load_zones,
+)
 from powerdns.tests.utils import (
+    CachedTestCase,
     DomainFactory,
     DomainTemplateFactory,
     RecordFactory,
@@ -185,3 +197,215 @@ class TestAutoPtr(TestCase):
         assert_does_exist(Record, name='1.1.168.192.in-addr.arpa', type='PTR')
         a.delete()
         assert_not_exists(Record, name='1.1.168.192.in-addr.arpa', type='PTR')
+
+
+class TestReconcilePtrs(TestCase):
+    """Tests for the set-based PTR reconciler"""
+
+    def setUp(self):
+        reverse_template = DomainTemplateFactory(name='reverse')
+        RecordTemplateFactory(
+            type='SOA',
+            name='{domain-name}',
+            content=(
+                'ns1.{domain-name} hostmaster.{domain-name} '
+                '0 43200 600 1209600 600'
+            ),
+            domain_template=reverse_template,
+        )
+        self.domain = DomainFactory(
+            name='example.com',
+            template=None,
+            reverse_template=None,
+        )
+        for i in range(1, 4):
+            RecordFactory(
+                domain=self.domain,
+                type='A',
+                name='host{}.example.com'.format(i),
+                content='192.168.1.{}'.format(i),
+                auto_ptr=AutoPtrOptions.NEVER,
+            )
+        # Behind the back of the signals
+        Record.objects.filter(type='A').update(
+            auto_ptr=AutoPtrOptions.ALWAYS
+        )
+
+    def ptrs(self):
+        return dict(
+            Record.objects.filter(type='PTR').values_list('name', 'content')
+        )
+
+    def reconcile(self, **kwargs):
+        return reconcile_ptrs(
+            Record.objects.filter(domain=self.domain), **kwargs
+        )
+
+    def test_create(self):
+        """Missing PTRs and their domains are created"""
+        changes = self.reconcile()
+        self.assertEqual(list(changes.new_domains), ['1.168.192.in-addr.arpa'])
+        self.assertEqual(self.ptrs(), {
+            '1.1.168.192.in-addr.arpa': 'host1.example.com',
+            '2.1.168.192.in-addr.arpa': 'host2.example.com',
+            '3.1.168.192.in-addr.arpa': 'host3.example.com',
+        })
+        self.assertEqual(self.reconcile(), ({}, [], [], []))
+
+    def test_update_delete(self):
+        """Changed PTRs are updated in place, unwanted ones deleted"""
+        self.reconcile()
+        ptr = Record.objects.get(name='1.1.168.192.in-addr.arpa')
+        Record.objects.filter(name='host1.example.com').update(
+            content='192.168.1.4'
+        )
+        Record.objects.filter(name='host2.example.com').update(
+            auto_ptr=AutoPtrOptions.NEVER
+        )
+        changes = self.reconcile()
+        self.assertEqual(
+            (len(changes.inserts), len(changes.updates), len(changes.deletes)),
+            (0, 1, 1),
+        )
+        self.assertEqual(self.ptrs(), {
+            '4.1.168.192.in-addr.arpa': 'host1.example.com',
+            '3.1.168.192.in-addr.arpa': 'host3.example.com',
+        })
+        self.assertEqual(
+            Record.objects.get(name='4.1.168.192.in-addr.arpa').pk, ptr.pk
+        )
+
+    def test_only_if_domain(self):
+        """No domains are created for records that don't want them"""
+        Record.objects.filter(type='A').update(
+            auto_ptr=AutoPtrOptions.ONLY_IF_DOMAIN
+        )
+        self.assertEqual(self.reconcile(), ({}, [], [], []))
+
+    def test_longest_match(self):
+        """PTRs go to the most specific existing reverse domain"""
+        Record.objects.filter(type='A').update(
+            auto_ptr=AutoPtrOptions.ONLY_IF_DOMAIN
+        )
+        domain = DomainFactory(name='168.192.in-addr.arpa', template=None)
+        self.reconcile()
+        self.assertEqual(
+            Record.objects.get(name='1.1.168.192.in-addr.arpa').domain, domain
+        )
+
+    def test_dry_run(self):
+        """The command reports what would be changed"""
+        out = StringIO()
+        call_command('reconcile_ptrs', 'example.com', dry_run=True, stdout=out)
+        self.assertIn(
+            '+ 1.1.168.192.in-addr.arpa IN PTR host1.example.com',
+            out.getvalue(),
+        )
+        self.assertIn(
+            'Dry run: 1 domains, 3 PTRs created, 0 updated, 0 deleted',
+            out.getvalue(),
+        )
+        self.assertEqual(self.ptrs(), {})
+        call_command('reconcile_ptrs', '--all', stdout=out)
+        self.assertEqual(len(self.ptrs()), 3)
+
+
+class TestReverseZones(CachedTestCase):
+    """Reverse domains of PTRs are looked up in a cached prefix tree"""
+
+    def setUp(self):
+        super().setUp()
+        self.domain = DomainFactory(
+            name='example.com',
+            template=None,
+            reverse_template=None,
+        )
+        self.record = RecordFactory(
+            domain=self.domain,
+            type='A',
+            name='www.example.com',
+            content='192.168.1.1',
+            auto_ptr=AutoPtrOptions.ONLY_IF_DOMAIN,
+        )
+
+    def domain_queries(self, context):
+        return [
+            query for query in context.captured_queries
+            if 'FROM "domains"' in query['sql']
+        ]
+
+    def test_no_domain_lookups(self):
+        """Once cached, creating PTRs doesn't look up domains"""
+        reverse_domain = DomainFactory(name='1.168.192.in-addr.arpa')
+        self.record.create_ptr()
+        with CaptureQueriesContext(connection) as context:
+            self.record.create_ptr()
+        self.assertEqual(self.domain_queries(context), [])
+        self.assertEqual(
+            Record.objects.get(depends_on=self.record).domain, reverse_domain
+        )
+
+    def test_invalidated(self):
+        """New, renamed and deleted domains are noticed"""
+        self.record.create_ptr()
+        assert_not_exists(Record, depends_on=self.record)
+        reverse_domain = DomainFactory(name='1.168.192.in-addr.arpa')
+        self.record.create_ptr()
+        assert_does_exist(Record, depends_on=self.record)
+        reverse_domain.name = '2.168.192.in-addr.arpa'
+        reverse_domain.save()
+        self.assertIsNone(find_reverse_zone('192.168.1.1'))
+        self.assertEqual(
+            find_reverse_zone('192.168.2.1'),
+            ('2.168.192.in-addr.arpa', reverse_domain.pk),
+        )
+        reverse_domain.delete()
+        self.assertIsNone(find_reverse_zone('192.168.2.1'))
+
+    def test_other_processes(self):
+        """Other processes load the tree again after domain changes"""
+        # A process sharing the Django cache
+        other_zones = SharedCache('zones')
+        name = '1.1.168.192.in-addr.arpa'
+        self.assertIsNone(other_zones.get('tree', load_zones).find(name))
+        reverse_domain = DomainFactory(name='1.168.192.in-addr.arpa')
+        self.assertEqual(
+            other_zones.get('tree', load_zones).find(name),
+            (reverse_domain.name, reverse_domain.pk),
+        )
+
+    def test_rolled_back(self):
+        """Domains of rolled back transactions are forgotten"""
+        self.record.create_ptr()
+        with transaction.atomic():
+            reverse_domain = DomainFactory(name='1.168.192.in-addr.arpa')
+            self.assertEqual(
+                find_reverse_zone('192.168.1.1'),
+                (reverse_domain.name, reverse_domain.pk),
+            )
+            transaction.set_rollback(True)
+        self.assertIsNone(find_reverse_zone('192.168.1.1'))
+        self.record.create_ptr()
+        assert_not_exists(Record, depends_on=self.record)
+
+    def test_longest_match(self):
+        """PTRs go to the most specific reverse domain"""
+        wide = DomainFactory(name='168.192.in-addr.arpa')
+        self.record.create_ptr()
+        ptr = Record.objects.get(depends_on=self.record)
+        self.assertEqual(ptr.domain, wide)
+        self.assertEqual(ptr.name, '1.1.168.192.in-addr.arpa')
+        narrow = DomainFactory(name='1.168.192.in-addr.arpa')
+        self.record.create_ptr()
+        self.assertEqual(Record.objects.get(pk=ptr.pk).domain, narrow)
+
+    def test_ipv6(self):
+        """IPv6 reverse domains are matched by nibbles"""
+        DomainFactory(name='8.b.d.0.1.0.0.2.ip6.arpa')
+        domain = DomainFactory(name='0.0.0.0.8.b.d.0.1.0.0.2.ip6.arpa')
+        self.assertEqual(
+            find_reverse_zone('2001:db8::1'), (domain.name, domain.pk)
+        )
+        self.assertEqual(
+            find_reverse_zone('2001:db8:1::1')[0], '8.b.d.0.1.0.0.2.ip6.arpa'
+        )
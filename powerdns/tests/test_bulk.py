@@ -0,0 +1,246 @@
+"""Tests for creating many records at once"""
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from powerdns.bulk import bulk_create_records, delete_domain
+from powerdns.models.authorisations import Authorisation
+from powerdns.models.powerdns import (
+    CryptoKey,
+    Domain,
+    DomainMetadata,
+    Record,
+)
+from powerdns.tests.utils import (
+    CachedTestCase,
+    DomainFactory,
+    DomainTemplateFactory,
+    RecordFactory,
+    RecordTemplateFactory,
+    user_client,
+)
+from powerdns.utils import AutoPtrOptions
+
+
+class TestBulkCreate(CachedTestCase):
+    """Tests for bulk_create_records"""
+
+    def setUp(self):
+        super().setUp()
+        reverse_template = DomainTemplateFactory(name='reverse')
+        RecordTemplateFactory(
+            type='SOA',
+            name='{domain-name}',
+            content=(
+                'ns1.{domain-name} hostmaster.{domain-name} '
+                '0 43200 600 1209600 600'
+            ),
+            domain_template=reverse_template,
+        )
+        self.domain = DomainFactory(
+            name='example.com',
+            template=None,
+            reverse_template=None,
+        )
+        self.soa = RecordFactory(
+            domain=self.domain,
+            type='SOA',
+            name='example.com',
+            content='ns1.example.com hostmaster.example.com '
+                    '0 43200 600 1209600 600',
+            change_date=1,
+        )
+
+    def records(self, count, **kwargs):
+        kwargs.setdefault('auto_ptr', AutoPtrOptions.ALWAYS)
+        return [
+            Record(
+                domain=self.domain,
+                type='A',
+                name='HOST{}.example.com'.format(i),
+                content='192.168.{}.{}'.format(i // 200, i % 200 + 1),
+                **kwargs
+            )
+            for i in range(count)
+        ]
+
+    def test_create(self):
+        """Records are created with their computed fields"""
+        with CaptureQueriesContext(connection) as context:
+            bulk_create_records(self.records(300))
+        # Queries depend on the number of batches and new reverse domains
+        self.assertLess(len(context.captured_queries), 40)
+        record = Record.objects.get(name='host0.example.com')
+        self.assertEqual(record.number, 3232235521)
+        self.assertIsNone(record.ordername)
+        self.assertIsNotNone(record.change_date)
+        ptr = Record.objects.get(depends_on=record)
+        self.assertEqual(ptr.name, '1.0.168.192.in-addr.arpa')
+        self.assertEqual(ptr.content, 'host0.example.com')
+        self.assertEqual(
+            Record.objects.filter(type='PTR').count(), 300
+        )
+        self.assertTrue(Record.objects.filter(
+            domain__name='1.168.192.in-addr.arpa', type='SOA'
+        ).exists())
+
+    def test_soa_bumped(self):
+        """The SOA of a zone is updated once"""
+        bulk_create_records(self.records(3))
+        self.assertGreater(
+            Record.objects.get(pk=self.soa.pk).change_date, 1
+        )
+
+    def test_ordername(self):
+        """Ordernames are computed for signed zones"""
+        CryptoKey.objects.create(domain=self.domain, flags=257, active=True)
+        bulk_create_records(self.records(1))
+        self.assertEqual(
+            Record.objects.get(name='host0.example.com').ordername, 'host0'
+        )
+
+    def test_no_ptr(self):
+        """PTRs follow auto_ptr"""
+        bulk_create_records(
+            self.records(2, auto_ptr=AutoPtrOptions.ONLY_IF_DOMAIN)
+        )
+        self.assertFalse(Record.objects.filter(type='PTR').exists())
+        self.assertFalse(
+            Domain.objects.filter(name__endswith='in-addr.arpa').exists()
+        )
+
+    def test_invalid(self):
+        """Nothing is saved if any of the records is invalid"""
+        records = self.records(2)
+        records[1].content = 'example.org'
+        with self.assertRaises(ValidationError):
+            bulk_create_records(records)
+        self.assertFalse(Record.objects.filter(type='A').exists())
+
+    def test_conflicts(self):
+        """Existing and new records are checked for conflicts"""
+        RecordFactory(
+            domain=self.domain,
+            type='CNAME',
+            name='host0.example.com',
+            content='www.example.com',
+        )
+        records = self.records(2)
+        records.append(Record(
+            domain=self.domain,
+            type='A',
+            name='host1.example.com',
+            content='192.168.0.2',
+        ))
+        with self.assertRaises(ValidationError) as context:
+            bulk_create_records(records)
+        self.assertEqual(len(context.exception.messages), 2)
+
+    def test_batch_conflicts(self):
+        """New records are checked for conflicts with each other"""
+        records = self.records(1, auto_ptr=AutoPtrOptions.NEVER)
+        records.append(Record(
+            domain=self.domain,
+            type='CNAME',
+            name=records[0].name,
+            content='www.example.com',
+            auto_ptr=AutoPtrOptions.NEVER,
+        ))
+        with self.assertRaises(ValidationError) as context:
+            bulk_create_records(records)
+        self.assertEqual(context.exception.messages, [
+            '{} IN CNAME www.example.com: Conflicting records are created '
+            'with it'.format(records[0].name),
+        ])
+        self.assertFalse(Record.objects.filter(name=records[0].name).exists())
+
+
+class TestDeleteDomain(TestCase):
+    """Tests for delete_domain"""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            'user', 'user@example.com', 'password'
+        )
+        self.domain = DomainFactory(
+            name='example.com',
+            template=None,
+            reverse_template=None,
+        )
+        self.reverse_domain = DomainFactory(
+            name='1.168.192.in-addr.arpa',
+            template=None,
+            reverse_template=None,
+        )
+        RecordFactory(
+            domain=self.reverse_domain,
+            type='SOA',
+            name='1.168.192.in-addr.arpa',
+            content='ns1.example.com hostmaster.example.com '
+                    '0 43200 600 1209600 600',
+        )
+        bulk_create_records(
+            Record(
+                domain=self.domain,
+                type='A',
+                name='host{}.example.com'.format(i),
+                content='192.168.1.{}'.format(i),
+                auto_ptr=AutoPtrOptions.ONLY_IF_DOMAIN,
+            )
+            for i in range(1, 101)
+        )
+        Record.objects.filter(type='SOA').update(change_date=1)
+        self.record = Record.objects.get(name='host1.example.com')
+        Authorisation.objects.create(
+            owner=self.user, authorised=self.user, target=self.record,
+        )
+        DomainMetadata.objects.create(
+            domain=self.domain, kind='ALLOW-AXFR-FROM', content='AUTO-NS',
+        )
+
+    def check_deleted(self):
+        self.assertFalse(Domain.objects.filter(name='example.com').exists())
+        self.assertEqual(
+            list(Record.objects.values_list('type', flat=True)), ['SOA']
+        )
+        self.assertFalse(Authorisation.objects.exists())
+        self.assertFalse(DomainMetadata.objects.exists())
+        self.assertGreater(
+            Record.objects.get(type='SOA').change_date, 1
+        )
+
+    def test_delete(self):
+        """Records and PTRs are deleted with a few queries"""
+        self.assertEqual(Record.objects.filter(type='PTR').count(), 100)
+        with CaptureQueriesContext(connection) as context:
+            delete_domain(self.domain)
+        self.assertLess(len(context.captured_queries), 30)
+        self.check_deleted()
+
+    def test_admin_action(self):
+        """The admin action deletes selected domains the same way"""
+        self.client.login(username='user', password='password')
+        url = reverse('admin:powerdns_domain_changelist')
+        data = {'action': 'delete_selected', '_selected_action': [
+            self.domain.pk,
+        ]}
+        response = self.client.post(url, data)
+        self.assertContains(response, 'Are you sure?')
+        data['post'] = 'yes'
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertLess(len(context.captured_queries), 50)
+        self.check_deleted()
+
+    def test_api(self):
+        """The API deletes domains the same way"""
+        response = user_client(self.user).delete(
+            reverse('domain-detail', kwargs={'pk': self.domain.pk})
+        )
+        self.assertEqual(response.status_code, 204)
+        self.check_deleted()
@@ -0,0 +1,118 @@
+"""Tests for zone consistency checks"""
+
+import json
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from powerdns.consistency import check_zone, check_zones
+from powerdns.models.powerdns import CryptoKey, Record
+from powerdns.tests.utils import DomainFactory, RecordFactory
+from powerdns.utils import AutoPtrOptions
+
+
+class TestConsistency(TestCase):
+    """Tests for the check_zones command and its checks"""
+
+    def setUp(self):
+        self.domain = DomainFactory(
+            name='example.com',
+            template=None,
+            reverse_template=None,
+        )
+        self.other_domain = DomainFactory(
+            name='example.org',
+            template=None,
+            reverse_template=None,
+        )
+        for domain in [self.domain, self.other_domain]:
+            RecordFactory(
+                domain=domain,
+                type='SOA',
+                name=domain.name,
+                content='ns1.{0} hostmaster.{0} 0 1 2 3 4'.format(
+                    domain.name
+                ),
+                auto_ptr=AutoPtrOptions.NEVER,
+            )
+
+    def record(self, **kwargs):
+        kwargs.setdefault('domain', self.domain)
+        kwargs.setdefault('auto_ptr', AutoPtrOptions.NEVER)
+        return RecordFactory(**kwargs)
+
+    def checks(self, domain):
+        return sorted(
+            (finding.check, finding.pk) for finding in check_zone(domain.pk)
+        )
+
+    def test_consistent(self):
+        """Consistent zones have no findings"""
+        self.record(
+            type='CNAME', name='www.example.com', content='example.com',
+        )
+        self.record(type='A', name='example.com', content='192.168.1.1')
+        self.assertEqual(self.checks(self.domain), [])
+
+    def test_soa(self):
+        """Missing and duplicate SOA records are found"""
+        soa = self.record(
+            type='SOA', name='example.com',
+            content='ns2.example.com hostmaster.example.com 0 1 2 3 4',
+        )
+        self.assertEqual(self.checks(self.domain), [('extra_soa', soa.pk)])
+        Record.objects.filter(domain=self.domain, type='SOA').delete()
+        self.assertEqual(self.checks(self.domain), [('missing_soa', None)])
+
+    def test_cname_conflicts(self):
+        """CNAME records sharing a name with other records are found"""
+        cname = self.record(
+            type='CNAME', name='www.example.com', content='example.com',
+        )
+        other = self.record(
+            type='TXT', name='www.example.com', content='text',
+        )
+        [finding] = check_zone(self.domain.pk)
+        self.assertEqual(finding.check, 'cname_conflict')
+        self.assertEqual(finding.pk, cname.pk)
+        self.assertIn(str(other.pk), finding.message)
+
+    def test_orphan_ptrs(self):
+        """PTR records depending on other than A records are found"""
+        a = self.record(type='A', name='a.example.com', content='192.168.1.1')
+        cname = self.record(
+            type='CNAME', name='www.example.com', content='example.com',
+        )
+        self.record(
+            type='PTR', name='1.1.168.192.in-addr.arpa',
+            content='a.example.com', depends_on=a,
+        )
+        bad = self.record(
+            type='PTR', name='2.1.168.192.in-addr.arpa',
+            content='www.example.com', depends_on=cname,
+        )
+        self.assertEqual(self.checks(self.domain), [('orphan_ptr', bad.pk)])
+
+    def test_check_zones(self):
+        """Findings of many zones are streamed"""
+        Record.objects.filter(type='SOA').delete()
+        findings = check_zones([self.domain.pk, self.other_domain.pk])
+        self.assertEqual(
+            sorted(finding.domain for finding in findings),
+            ['example.com', 'example.org'],
+        )
+
+    def test_command(self):
+        """The check_zones command writes a JSON object per line"""
+        Record.objects.filter(domain=self.other_domain, type='SOA').delete()
+        CryptoKey.objects.create(domain=None, flags=257, active=True)
+        out = StringIO()
+        call_command('check_zones', '--all', stdout=out, stderr=StringIO())
+        findings = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(
+            sorted(
+                (finding['check'], finding['domain']) for finding in findings
+            ),
+            [('missing_soa', 'example.org'), ('orphan_cryptokey', None)],
+        )
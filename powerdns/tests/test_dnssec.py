@@ -0,0 +1,126 @@
+"""Tests for DNSSEC mode detection"""
+
+from django.db import transaction
+
+from powerdns import dnssec
+from powerdns.dnssec import get_dnssec_profile
+from powerdns.models.powerdns import CryptoKey, DomainMetadata
+from powerdns.tests.utils import (
+    CachedTestCase,
+    DomainFactory,
+    RecordFactory,
+)
+from powerdns.utils import AutoPtrOptions
+
+
+class TestDNSSECProfile(CachedTestCase):
+    """Tests for per-domain DNSSEC profiles"""
+
+    def setUp(self):
+        super().setUp()
+        self.domain = DomainFactory(
+            name='example.com',
+            template=None,
+            reverse_template=None,
+        )
+
+    def sign(self):
+        CryptoKey.objects.create(domain=self.domain, flags=257, active=True)
+
+    def create_record(self, **kwargs):
+        kwargs.setdefault('domain', self.domain)
+        kwargs.setdefault('type', 'A')
+        kwargs.setdefault('name', 'www.example.com')
+        kwargs.setdefault('content', '192.168.1.1')
+        kwargs.setdefault('auto_ptr', AutoPtrOptions.NEVER)
+        return RecordFactory(**kwargs)
+
+    def test_unsigned(self):
+        """A domain without keys is unsigned"""
+        profile = get_dnssec_profile(self.domain.pk)
+        self.assertEqual(profile.mode, dnssec.UNSIGNED)
+        self.assertFalse(profile.signed)
+        self.assertIsNone(self.create_record().ordername)
+
+    def test_nsec(self):
+        """A domain with keys and no NSEC3PARAM uses NSEC"""
+        self.sign()
+        self.assertEqual(get_dnssec_profile(self.domain.pk).mode, dnssec.NSEC)
+        record = self.create_record(name='a.www.example.com')
+        self.assertEqual(record.ordername, 'www a')
+
+    def test_nsec3(self):
+        """NSEC3PARAM is parsed into the profile"""
+        self.sign()
+        DomainMetadata.objects.create(
+            domain=self.domain, kind='NSEC3PARAM', content='1 0 12 aabbccdd'
+        )
+        profile = get_dnssec_profile(self.domain.pk)
+        self.assertEqual(profile.mode, dnssec.NSEC3)
+        self.assertEqual(profile.nsec3param.iterations, 12)
+        self.assertEqual(profile.nsec3param.salt, 'aabbccdd')
+
+    def test_nsec3_narrow(self):
+        """In NSEC3 narrow mode the ordername is empty"""
+        self.sign()
+        DomainMetadata.objects.create(
+            domain=self.domain, kind='NSEC3PARAM', content='1 0 12 aabbccdd'
+        )
+        DomainMetadata.objects.create(
+            domain=self.domain, kind='NSEC3NARROW', content='1'
+        )
+        self.assertEqual(
+            get_dnssec_profile(self.domain.pk).mode, dnssec.NSEC3_NARROW
+        )
+        self.assertEqual(self.create_record().ordername, '')
+
+    def test_profile_cached(self):
+        """Record saves don't query for DNSSEC mode once it's cached"""
+        record = self.create_record()
+        with self.assertNumQueries(0):
+            self.assertIsNone(record._generate_ordername())
+
+    def test_rolled_back(self):
+        """Profiles of rolled back transactions are forgotten"""
+        with transaction.atomic():
+            self.sign()
+            self.assertIsNotNone(self.create_record().ordername)
+            transaction.set_rollback(True)
+        self.assertFalse(get_dnssec_profile(self.domain.pk).signed)
+        self.assertIsNone(self.create_record().ordername)
+
+    def test_invalidated_on_key_changes(self):
+        """Adding and removing keys changes the profile"""
+        self.assertFalse(get_dnssec_profile(self.domain.pk).signed)
+        self.sign()
+        self.assertTrue(get_dnssec_profile(self.domain.pk).signed)
+        CryptoKey.objects.all().delete()
+        self.assertFalse(get_dnssec_profile(self.domain.pk).signed)
+
+    def test_invalidated_on_metadata_changes(self):
+        """Changing the NSEC3PARAM changes the profile"""
+        self.sign()
+        metadata = DomainMetadata.objects.create(
+            domain=self.domain, kind='NSEC3PARAM', content='1 0 12 aabbccdd'
+        )
+        self.assertEqual(
+            get_dnssec_profile(self.domain.pk).nsec3param.iterations, 12
+        )
+        metadata.content = '1 0 5 aabbccdd'
+        metadata.save()
+        self.assertEqual(
+            get_dnssec_profile(self.domain.pk).nsec3param.iterations, 5
+        )
+        metadata.delete()
+        self.assertEqual(get_dnssec_profile(self.domain.pk).mode, dnssec.NSEC)
+
+    def test_moved_key(self):
+        """Moving a key to another domain changes both profiles"""
+        other = DomainFactory(name='example.org')
+        self.sign()
+        self.assertTrue(get_dnssec_profile(self.domain.pk).signed)
+        key = CryptoKey.objects.get(domain=self.domain)
+        key.domain = other
+        key.save()
+        self.assertFalse(get_dnssec_profile(self.domain.pk).signed)
+        self.assertTrue(get_dnssec_profile(other.pk).signed)
@@ -19,11 +19,6 @@ class TestSOASerialUpdate(RecordTestCase):
                 '0 43200 600 1209600 600'
             ),
         )
-        # Less than 1 second will elapse until the test runs, so we update
-        # this manually while circumventing save()
-        Record.objects.filter(pk=self.soa_record.pk).update(
-            change_date=1432720132
-        )
         self.a_record = RecordFactory(
             domain=self.domain,
             type='A',
@@ -38,6 +33,11 @@ class TestSOASerialUpdate(RecordTestCase):
             content='www.example.com',
             auto_ptr=AutoPtrOptions.NEVER,
         )
+        # Less than 1 second will elapse until the test runs, so we update
+        # this manually while circumventing save()
+        Record.objects.filter(pk=self.soa_record.pk).update(
+            change_date=1432720132
+        )
 
     def test_soa_update(self):
         """Test if SOA change_date is updated when a record is removed"""
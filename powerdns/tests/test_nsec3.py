@@ -0,0 +1,96 @@
+"""Tests for NSEC3 hashing"""
+
+from django.test import TestCase
+
+from powerdns import nsec3
+from powerdns.models.powerdns import CryptoKey, DomainMetadata, Record
+from powerdns.tests.utils import DomainFactory, RecordFactory
+from powerdns.utils import AutoPtrOptions
+
+
+# Hashes from RFC 5155 appendix A (salt aabbccdd, 12 iterations), the same
+# as returned by `pdnssec hash-zone-record example <name>`
+RFC5155_VECTORS = {
+    'example': '0p9mhaveqvm6t7vbl5lop2u3t2rp3tom',
+    'a.example': '35mthgpgcu1qg68fab165klnsnk3dpvl',
+    'ai.example': 'gjeqe526plbf1g8mklp59enfd789njgi',
+    'ns1.example': '2t7b4g4vsa5smi47k61mv5bv1a22bojr',
+    'ns2.example': 'q04jkcevqvmu85r014c7dkba38o0ji5r',
+    'w.example': 'k8udemvp1j2f7eg6jebps17vp3n8i58h',
+    '*.w.example': 'r53bq7cc2uvmubfu5ocmm6pers9tk9en',
+    'x.w.example': 'b4um86eghhds6nea196smvmlo4ors995',
+    'y.w.example': 'ji6neoaepv8b5o6k4ev33abha8ht9fgc',
+    'x.y.w.example': '2vptu5timamqttgl4luu9kg21e0aor3s',
+    'xx.example': 't644ebqk9bibcna874givr6joj62mlhv',
+}
+
+
+class TestNSEC3Hash(TestCase):
+    """Tests for the NSEC3 hashing functions"""
+
+    def test_single(self):
+        """Single names are hashed like pdnssec does"""
+        for name, hash_ in RFC5155_VECTORS.items():
+            self.assertEqual(nsec3.nsec3_hash(name, 'aabbccdd', 12), hash_)
+
+    def test_case_and_trailing_dot(self):
+        """Names are hashed in the canonical form"""
+        self.assertEqual(
+            nsec3.nsec3_hash('A.Example.', 'AABBCCDD', 12),
+            RFC5155_VECTORS['a.example'],
+        )
+
+    def test_many(self):
+        """Batches of names are hashed in order"""
+        names = sorted(RFC5155_VECTORS)
+        self.assertEqual(
+            nsec3.nsec3_hash_many(names, 'aabbccdd', 12),
+            [RFC5155_VECTORS[name] for name in names],
+        )
+
+    def test_cache(self):
+        """Hashes are memoized by name, salt and iterations"""
+        nsec3.cache_clear()
+        nsec3.nsec3_hash_many(['a.example', 'a.example'], 'aabbccdd', 12)
+        nsec3.nsec3_hash('a.example', 'aabbccdd', 11)
+        info = nsec3.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 2))
+
+    def test_no_salt(self):
+        """'-' means no salt"""
+        self.assertEqual(
+            nsec3.nsec3_hash('example', '-', 0),
+            nsec3.nsec3_hash('example', '', 0),
+        )
+
+
+class TestNSEC3Ordername(TestCase):
+    """Records in NSEC3 domains get hashed ordernames"""
+
+    def test_ordername(self):
+        domain = DomainFactory(
+            name='example',
+            template=None,
+            reverse_template=None,
+        )
+        CryptoKey.objects.create(domain=domain, flags=257, active=True)
+        DomainMetadata.objects.create(
+            domain=domain, kind='NSEC3PARAM', content='1 0 12 aabbccdd'
+        )
+        record = RecordFactory(
+            domain=domain,
+            type='A',
+            name='ns1.example',
+            content='192.0.2.1',
+            auto_ptr=AutoPtrOptions.NEVER,
+        )
+        self.assertEqual(record.ordername, RFC5155_VECTORS['ns1.example'])
+        # Existing records are rectified when the parameters change
+        DomainMetadata.objects.filter(kind='NSEC3PARAM').delete()
+        DomainMetadata.objects.create(
+            domain=domain, kind='NSEC3PARAM', content='1 0 1 -'
+        )
+        self.assertEqual(
+            Record.objects.get(pk=record.pk).ordername,
+            nsec3.nsec3_hash('ns1.example', '-', 1),
+        )
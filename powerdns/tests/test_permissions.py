@@ -2,14 +2,27 @@
 
 import functools as ft
 
-from django.contrib.auth.models import User
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
 from django.core.urlresolvers import reverse
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from threadlocals.threadlocals import set_current_user
 
 from powerdns.models.authorisations import Authorisation
+from powerdns.models.powerdns import (
+    Domain,
+    Record,
+    SubDomainValidator,
+    find_zone,
+    is_domain_authorised,
+)
 from powerdns.utils import AutoPtrOptions
 
 from powerdns.tests.utils import (
+    CachedTestCase,
     DomainFactory,
     RecordFactory,
     user_client,
@@ -129,6 +142,19 @@ class TestPermissions(TestCase):
         )
         self.assertEqual(request.status_code, 403)
 
+    def test_subdomain_validator(self):
+        """The closest superdomain is found with a single query"""
+        set_current_user(self.user)
+        self.addCleanup(set_current_user, None)
+        validator = SubDomainValidator()
+        with self.assertNumQueries(1):
+            validator('a.b.c.u.example.com')
+        with self.assertRaises(ValidationError):
+            validator('a.b.c.su.example.com')
+        DomainFactory(name='c.su.example.com', owner=self.user)
+        validator('a.b.c.su.example.com')
+        validator('new-example.com')
+
     def test_su_can_edit_all_records(self):
         """Superuser can edit record not owned by herself."""
         request = self.su_client.patch(
@@ -158,6 +184,39 @@ class TestPermissions(TestCase):
         )
         self.assertEqual(request.status_code, 200)
 
+    def test_domain_authorisation_applies_to_records(self):
+        """Normal user can edit records of a domain she has been authorised
+        to."""
+        Authorisation.objects.create(
+            owner=self.superuser,
+            target=self.su_domain,
+            authorised=self.user,
+        )
+        request = self.u_client.patch(
+            get_record_url(self.su_record),
+            {'content': '192.168.1.3'},
+        )
+        self.assertEqual(request.status_code, 200)
+
+    def test_domain_authorisation_queries(self):
+        """Domain authorisations of a record are checked with one query,
+        or none if they have been prefetched"""
+        Authorisation.objects.create(
+            owner=self.superuser,
+            target=self.su_domain,
+            authorised=self.user,
+        )
+        ContentType.objects.get_for_model(Domain)
+        record = Record.objects.get(pk=self.su_record.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(is_domain_authorised(self.user, record))
+            self.assertFalse(is_domain_authorised(AnonymousUser(), record))
+        record = Record.objects.select_related('domain').prefetch_related(
+            'domain__authorisations',
+        ).get(pk=self.u_record.pk)
+        with self.assertNumQueries(0):
+            self.assertFalse(is_domain_authorised(self.user, record))
+
     def test_u_can_edit_her_records(self):
         """Normal user can edit record not owned by herself."""
         request = self.u_client.patch(
@@ -209,6 +268,45 @@ class TestPermissions(TestCase):
         )
         self.assertEqual(request.status_code, 201)
 
+    def test_records_zone_detected(self):
+        """The domain of a new record is found by its name if not given"""
+        sub_domain = DomainFactory(
+            name='sub.u.example.com',
+            owner=self.user,
+        )
+        for name, domain in [
+            ('site.u.example.com', self.u_domain),
+            ('www.site.sub.u.example.com', sub_domain),
+        ]:
+            request = self.u_client.post(
+                reverse('record-list'),
+                {
+                    'name': name,
+                    'content': '192.168.1.4',
+                    'type': 'A',
+                    'auto_ptr': AutoPtrOptions.NEVER.id,
+                },
+            )
+            self.assertEqual(request.status_code, 201)
+            self.assertEqual(
+                Record.objects.get(name=name).domain, domain
+            )
+
+    def test_records_zone_detection_refused(self):
+        """Detected domains are checked like the given ones"""
+        for name in ['site.su.example.com', 'site.example.org']:
+            request = self.u_client.post(
+                reverse('record-list'),
+                {
+                    'name': name,
+                    'content': '192.168.1.4',
+                    'type': 'A',
+                    'auto_ptr': AutoPtrOptions.NEVER.id,
+                },
+            )
+            self.assertEqual(request.status_code, 400)
+            self.assertIn('domain', request.data)
+
     def test_user_cant_create_records_in_other_domains(self):
         """Normal user can't create records in domain she doesn't own."""
         request = self.u_client.post(
@@ -222,3 +320,133 @@ class TestPermissions(TestCase):
             },
         )
         self.assertEqual(request.status_code, 400)
+
+
+class TestChangelistQueries(TestCase):
+    """The admin changelists check permissions of all rows at once"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            'owner', 'owner@example.com', 'password'
+        )
+        self.user = User.objects.create_user(
+            'user', 'user@example.com', 'password'
+        )
+        self.user.is_staff = True
+        self.user.save()
+        self.client.login(username='user', password='password')
+
+    def add_domain(self, i, authorised):
+        domain = DomainFactory(
+            name='example{}.com'.format(i),
+            owner=self.owner,
+            template=None,
+            reverse_template=None,
+        )
+        record = RecordFactory(
+            domain=domain,
+            name='www.{}'.format(domain.name),
+            type='A',
+            content='192.168.1.1',
+            owner=self.owner,
+            auto_ptr=AutoPtrOptions.NEVER,
+        )
+        if authorised:
+            for target in [domain, record]:
+                Authorisation.objects.create(
+                    owner=self.owner, authorised=self.user, target=target,
+                )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_changelists(self):
+        """The number of queries doesn't depend on the number of rows"""
+        urls = [
+            reverse('admin:powerdns_domain_changelist'),
+            reverse('admin:powerdns_record_changelist'),
+        ]
+        for i in range(2):
+            self.add_domain(i, authorised=i % 2)
+        counts = [self.count_queries(url) for url in urls]
+        for i in range(2, 20):
+            self.add_domain(i, authorised=i % 2)
+        self.assertEqual([self.count_queries(url) for url in urls], counts)
+        for url in urls:
+            response = self.client.get(url)
+            self.assertContains(response, '>Change</a>', count=10)
+            self.assertContains(response, '>Request change</a>', count=10)
+
+
+class TestZoneDetection(CachedTestCase):
+    """Domains of new records are detected by what's in the database"""
+
+    def test_rolled_back(self):
+        user = User.objects.create_superuser(
+            'user', 'user@example.com', 'password'
+        )
+        domain = DomainFactory(
+            name='example.com',
+            owner=user,
+            template=None,
+            reverse_template=None,
+        )
+        with transaction.atomic():
+            DomainFactory(
+                name='sub.example.com',
+                owner=user,
+                template=None,
+                reverse_template=None,
+            )
+            self.assertEqual(
+                find_zone('www.sub.example.com')[0], 'sub.example.com'
+            )
+            transaction.set_rollback(True)
+        self.assertEqual(
+            find_zone('www.sub.example.com'), ('example.com', domain.pk)
+        )
+        request = user_client(user).post(
+            reverse('record-list'),
+            {
+                'name': 'www.sub.example.com',
+                'content': '192.168.1.4',
+                'type': 'A',
+                'auto_ptr': AutoPtrOptions.NEVER.id,
+            },
+        )
+        self.assertEqual(request.status_code, 201)
+        self.assertEqual(
+            Record.objects.get(name='www.sub.example.com').domain, domain
+        )
+
+    def test_stale_tree(self):
+        """Domains unknown to the cached zone tree are detected"""
+        user = User.objects.create_superuser(
+            'user', 'user@example.com', 'password'
+        )
+        DomainFactory(
+            name='example.com',
+            owner=user,
+            template=None,
+            reverse_template=None,
+        )
+        self.assertEqual(find_zone('www.sub.example.com')[0], 'example.com')
+        # No signals are sent, as if another process made the change
+        Domain.objects.bulk_create([Domain(name='sub.example.com')])
+        request = user_client(user).post(
+            reverse('record-list'),
+            {
+                'name': 'www.sub.example.com',
+                'content': '192.168.1.4',
+                'type': 'A',
+                'auto_ptr': AutoPtrOptions.NEVER.id,
+            },
+        )
+        self.assertEqual(request.status_code, 201)
+        self.assertEqual(
+            Record.objects.get(name='www.sub.example.com').domain.name,
+            'sub.example.com',
+        )
@@ -0,0 +1,255 @@
+"""Tests for saving records and their computed fields"""
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from powerdns.models.powerdns import Record
+from powerdns.tests.utils import (
+    DomainFactory,
+    DomainTemplateFactory,
+    RecordFactory,
+)
+from powerdns.utils import AutoPtrOptions
+
+
+class TestDirtyFieldsSave(TestCase):
+    """Record.save() doesn't redo work for unchanged fields"""
+
+    def setUp(self):
+        DomainTemplateFactory(name='reverse')
+        self.domain = DomainFactory(
+            name='example.com',
+            template=None,
+            reverse_template=None,
+        )
+        self.record = RecordFactory(
+            domain=self.domain,
+            type='A',
+            name='www.example.com',
+            content='192.168.1.1',
+            auto_ptr=AutoPtrOptions.ALWAYS,
+        )
+        self.ptr = Record.objects.get(depends_on=self.record)
+
+    def updates(self, queries):
+        return [
+            query['sql'] for query in queries
+            if 'UPDATE "records"' in query['sql'] and
+            '"records"."id" =' in query['sql']
+        ]
+
+    def test_changed_fields(self):
+        """Changed fields are reported until the record is saved"""
+        record = Record.objects.get(pk=self.record.pk)
+        self.assertEqual(record.get_changed_fields(), set())
+        record.ttl = 600
+        record.domain = DomainFactory(name='example.org')
+        self.assertEqual(record.get_changed_fields(), {'ttl', 'domain'})
+        record.save()
+        self.assertEqual(record.get_changed_fields(), set())
+        self.assertIsNone(Record(name='new.example.com').get_changed_fields())
+
+    def test_only_changed_columns_updated(self):
+        """Unchanged columns are not written"""
+        self.record.remarks = 'Web server'
+        with CaptureQueriesContext(connection) as context:
+            self.record.save()
+        updates = self.updates(context.captured_queries)
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"remarks"', updates[0])
+        self.assertIn('"change_date"', updates[0])
+        self.assertNotIn('"content"', updates[0])
+        self.assertNotIn('"ordername"', updates[0])
+        self.assertEqual(
+            Record.objects.get(pk=self.record.pk).remarks, 'Web server'
+        )
+
+    def test_ptr_kept(self):
+        """The PTR is not touched if only unrelated fields change"""
+        self.record.ttl = 600
+        with self.assertNumQueries(2):
+            # The record and the SOA of its zone
+            self.record.save()
+        self.assertTrue(Record.objects.filter(pk=self.ptr.pk).exists())
+
+    def test_ptr_updated(self):
+        """The PTR follows changes of the content"""
+        self.record.content = '192.168.1.2'
+        self.record.save()
+        self.assertEqual(
+            Record.objects.get(depends_on=self.record).name,
+            '2.1.168.192.in-addr.arpa',
+        )
+
+    def test_ptr_updated_in_place(self):
+        """The PTR keeps its id when it changes"""
+        self.record.content = '192.168.1.2'
+        self.record.name = 'web.example.com'
+        self.record.save()
+        ptr = Record.objects.get(pk=self.ptr.pk)
+        self.assertEqual(ptr.name, '2.1.168.192.in-addr.arpa')
+        self.assertEqual(ptr.content, 'web.example.com')
+
+    def test_ptr_unchanged(self):
+        """An unchanged PTR is not written and its zone stays the same"""
+        self.record.auto_ptr = AutoPtrOptions.ONLY_IF_DOMAIN
+        with CaptureQueriesContext(connection) as context:
+            self.record.save()
+        self.assertEqual(len(self.updates(context.captured_queries)), 1)
+        self.assertFalse([
+            query for query in context.captured_queries
+            if 'DELETE' in query['sql'] or 'INSERT' in query['sql']
+        ])
+        self.assertTrue(Record.objects.filter(pk=self.ptr.pk).exists())
+
+    def test_clone(self):
+        """A loaded record saved with its pk reset is inserted whole"""
+        record = Record.objects.get(pk=self.record.pk)
+        record.pk = None
+        record.name = 'web.example.com'
+        record.save()
+        self.assertNotEqual(record.pk, self.record.pk)
+        clone = Record.objects.get(pk=record.pk)
+        self.assertEqual(clone.reversed_name, 'com.example.web')
+        self.assertEqual(clone.content, '192.168.1.1')
+
+    def test_number(self):
+        """The IP number follows the content and type"""
+        self.record.content = '192.168.1.2'
+        self.record.save()
+        self.assertEqual(
+            Record.objects.get(pk=self.record.pk).number, 3232235778
+        )
+        self.record.type = 'CNAME'
+        self.record.content = 'web.example.com'
+        self.record.save()
+        self.assertIsNone(Record.objects.get(pk=self.record.pk).number)
+
+
+class TestChangeTracking(TestCase):
+    """Original values are remembered lazily"""
+
+    def setUp(self):
+        self.domain = DomainFactory(
+            name='example.com',
+            template=None,
+            reverse_template=None,
+        )
+        RecordFactory(
+            domain=self.domain,
+            type='CNAME',
+            name='www.example.com',
+            content='web.example.com',
+        )
+
+    def test_read_only(self):
+        """Records that are only read have no snapshot"""
+        record = Record.objects.get(name='www.example.com')
+        self.assertNotIn('_original_values', record.__dict__)
+        self.assertEqual(record.get_changed_fields(), set())
+
+    def test_first_assignment(self):
+        """The value before the first assignment is the original one"""
+        record = Record.objects.get(name='www.example.com')
+        record.content = 'web1.example.com'
+        record.content = 'web2.example.com'
+        self.assertEqual(
+            record.get_original_value('content'), 'web.example.com'
+        )
+        self.assertEqual(record.__dict__['_original_values'], {
+            'content': 'web.example.com',
+        })
+        record.content = 'web.example.com'
+        self.assertEqual(record.get_changed_fields(), set())
+
+    def test_deferred(self):
+        """Assigning a field that wasn't loaded is a change"""
+        record = Record.objects.only('name').get(name='www.example.com')
+        record.content = 'web.example.com'
+        self.assertEqual(record.get_changed_fields(), {'content'})
+
+    def test_refresh(self):
+        """Reloading from the database discards changes"""
+        record = Record.objects.get(name='www.example.com')
+        record.ttl = 1
+        record.refresh_from_db()
+        self.assertEqual(record.get_changed_fields(), set())
+
+    def test_deferred_read(self):
+        """Reading a deferred field keeps the changes of the others"""
+        record = Record.objects.only('id', 'name').get(name='www.example.com')
+        record.name = 'blog.example.com'
+        self.assertEqual(record.ttl, Record.objects.get(pk=record.pk).ttl)
+        record.save()
+        self.assertEqual(
+            Record.objects.get(pk=record.pk).name, 'blog.example.com'
+        )
+        record.content = 'site.example.com'
+        record.refresh_from_db(fields=['ttl'])
+        self.assertEqual(record.get_changed_fields(), {'content'})
+        record.save()
+        self.assertEqual(
+            Record.objects.get(pk=record.pk).content, 'site.example.com'
+        )
+
+
+class TestNumbers(TestCase):
+    """IP addresses are stored as indexed numbers"""
+
+    def setUp(self):
+        self.domain = DomainFactory(
+            name='example.com',
+            template=None,
+            reverse_template=None,
+        )
+        for i, content in enumerate([
+            '192.168.1.1',
+            '192.168.2.1',
+            '2001:db8::1',
+            '2001:db8:0:1::1',
+            '2001:db9::1',
+        ]):
+            RecordFactory(
+                domain=self.domain,
+                type='A' if '.' in content else 'AAAA',
+                name='host{}.example.com'.format(i),
+                content=content,
+                auto_ptr=AutoPtrOptions.NEVER,
+            )
+
+    def contents(self, network):
+        return set(
+            Record.objects.in_network(network).values_list(
+                'content', flat=True
+            )
+        )
+
+    def test_number6(self):
+        """The IPv6 number follows the content and type"""
+        record = Record.objects.get(content='2001:db8::1')
+        self.assertEqual(
+            (record.number6_high, record.number6_low),
+            (0x20010db800000000 - 2 ** 63, 1 - 2 ** 63),
+        )
+        self.assertIsNone(record.number)
+        record.type = 'CNAME'
+        record.content = 'web.example.com'
+        record.save()
+        record = Record.objects.get(pk=record.pk)
+        self.assertIsNone(record.number6_high)
+        self.assertIsNone(record.number6_low)
+
+    def test_in_network(self):
+        """Records are found by the networks of their addresses"""
+        self.assertEqual(self.contents('192.168.1.0/24'), {'192.168.1.1'})
+        self.assertEqual(
+            self.contents('192.168.0.0/16'), {'192.168.1.1', '192.168.2.1'}
+        )
+        self.assertEqual(self.contents('2001:db8::/64'), {'2001:db8::1'})
+        self.assertEqual(
+            self.contents('2001:db8::/32'),
+            {'2001:db8::1', '2001:db8:0:1::1'},
+        )
+        self.assertEqual(self.contents('2001:db8::1/128'), {'2001:db8::1'})
+        self.assertEqual(len(self.contents('::/0')), 3)
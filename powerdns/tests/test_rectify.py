@@ -0,0 +1,114 @@
+"""Tests for zone rectification"""
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from powerdns.models.powerdns import CryptoKey, DomainMetadata, Record
+from powerdns.rectify import rectify_zone, rectify_zones, update_ordernames
+from powerdns.tests.utils import DomainFactory, RecordFactory
+from powerdns.utils import AutoPtrOptions
+
+
+class TestRectify(TestCase):
+    """Tests for bulk ordername recomputation"""
+
+    def setUp(self):
+        self.domain = DomainFactory(
+            name='example.com',
+            template=None,
+            reverse_template=None,
+        )
+        self.other_domain = DomainFactory(
+            name='example.org',
+            template=None,
+            reverse_template=None,
+        )
+        for domain in [self.domain, self.other_domain]:
+            for name in ['www', 'mail', 'a.b']:
+                RecordFactory(
+                    domain=domain,
+                    type='A',
+                    name='{}.{}'.format(name, domain.name),
+                    content='192.168.1.1',
+                    auto_ptr=AutoPtrOptions.NEVER,
+                )
+
+    def ordernames(self, domain):
+        return dict(
+            Record.objects.filter(domain=domain).values_list(
+                'name', 'ordername'
+            )
+        )
+
+    def test_rectified_when_signed(self):
+        """Ordernames are recomputed when a key is added to a domain"""
+        CryptoKey.objects.create(domain=self.domain, flags=257, active=True)
+        self.assertEqual(self.ordernames(self.domain), {
+            'www.example.com': 'www',
+            'mail.example.com': 'mail',
+            'a.b.example.com': 'b a',
+        })
+        self.assertEqual(
+            set(self.ordernames(self.other_domain).values()), {None}
+        )
+
+    def test_rectified_when_unsigned(self):
+        """Ordernames are cleared when the last key is removed"""
+        key = CryptoKey.objects.create(
+            domain=self.domain, flags=257, active=True
+        )
+        key.delete()
+        self.assertEqual(set(self.ordernames(self.domain).values()), {None})
+
+    def test_rectified_when_narrow(self):
+        """Switching to NSEC3 narrow mode clears ordernames"""
+        CryptoKey.objects.create(domain=self.domain, flags=257, active=True)
+        DomainMetadata.objects.create(
+            domain=self.domain, kind='NSEC3PARAM', content='1 0 1 ab'
+        )
+        DomainMetadata.objects.create(
+            domain=self.domain, kind='NSEC3NARROW', content='1'
+        )
+        self.assertEqual(set(self.ordernames(self.domain).values()), {''})
+
+    def test_rectify_zone(self):
+        """Stale ordernames are fixed and counted"""
+        Record.objects.filter(domain=self.domain).update(ordername='stale')
+        Record.objects.filter(name='www.example.com').update(ordername=None)
+        self.assertEqual(rectify_zone(self.domain.pk), 2)
+        self.assertEqual(set(self.ordernames(self.domain).values()), {None})
+        self.assertEqual(rectify_zone(self.domain.pk), 0)
+
+    def test_rectify_zones(self):
+        """Many zones can be rectified at once"""
+        Record.objects.update(ordername='stale')
+        result = rectify_zones([self.domain.pk, self.other_domain.pk])
+        self.assertEqual(
+            result, {self.domain.pk: 3, self.other_domain.pk: 3}
+        )
+
+    def test_update_ordernames(self):
+        """Unique and shared ordernames are written"""
+        pks = list(
+            Record.objects.filter(domain=self.domain).values_list(
+                'pk', flat=True
+            )
+        )
+        update_ordernames({pks[0]: 'one', pks[1]: 'two', pks[2]: 'two'})
+        self.assertEqual(
+            dict(Record.objects.filter(pk__in=pks).values_list(
+                'pk', 'ordername'
+            )),
+            {pks[0]: 'one', pks[1]: 'two', pks[2]: 'two'},
+        )
+
+    def test_command(self):
+        """The rectify_zone command fixes given zones"""
+        Record.objects.update(ordername='stale')
+        out = StringIO()
+        call_command('rectify_zone', 'example.com', stdout=out)
+        self.assertIn('Rectified 3 records in 1 zones', out.getvalue())
+        self.assertEqual(
+            set(self.ordernames(self.other_domain).values()), {'stale'}
+        )
@@ -3,11 +3,12 @@
 # This file is essentially a 1:1 copy of test_uniqueness_constraints
 # The record requests should be validated like records
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 
 from powerdns.models.powerdns import Domain, Record
 from powerdns.tests.utils import RecordFactory, RecordTestCase
 from powerdns.models.requests import RecordRequest
-from powerdns.utils import AutoPtrOptions
+from powerdns.utils import AutoPtrOptions, validate_conflicts
 
 
 class TestRequestUniquenessConstraints(RecordTestCase):
@@ -100,3 +101,58 @@ class TestRequestUniquenessConstraints(RecordTestCase):
             target_content='site.example.com',
             target_owner=self.user,
         )
+
+    def test_batch(self):
+        """Many requests are checked for conflicts with one query"""
+        requests = [
+            RecordRequest(
+                domain=self.domain,
+                record=self.cname_record,
+                target_type='CNAME',
+                target_name='blog.example.com',
+                target_content='site.example.com',
+            ),
+        ] + [
+            RecordRequest(
+                domain=self.domain,
+                target_type='A',
+                target_name='host{}.example.com'.format(i),
+                target_content='192.168.1.{}'.format(i),
+            )
+            for i in range(1000)
+        ]
+        with self.assertNumQueries(3):
+            validate_conflicts(requests)
+        requests.append(RecordRequest(
+            domain=self.domain,
+            target_type='CNAME',
+            target_name='www.example.com',
+            target_content='site.example.com',
+        ))
+        with self.assertRaises(ValidationError) as context:
+            validate_conflicts(requests)
+        self.assertEqual(context.exception.messages, [
+            'www.example.com IN CNAME site.example.com: Conflicting records '
+            'exist: {}'.format(self.a_record.pk),
+        ])
+
+    def test_batch_conflicts(self):
+        """Requests of a batch are checked for conflicts with each other"""
+        requests = [
+            RecordRequest(
+                domain=self.domain,
+                target_type=type_,
+                target_name='new.example.com',
+                target_content=content,
+            )
+            for type_, content in [
+                ('A', '192.168.1.1'),
+                ('CNAME', 'site.example.com'),
+            ]
+        ]
+        with self.assertRaises(ValidationError) as context:
+            validate_conflicts(requests)
+        self.assertEqual(context.exception.messages, [
+            'new.example.com IN CNAME site.example.com: Conflicting records '
+            'are created with it',
+        ])
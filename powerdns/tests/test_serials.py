@@ -0,0 +1,146 @@
+"""Tests for coalescing SOA serial updates"""
+
+import unittest
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from powerdns.models.powerdns import Record
+from powerdns.serials import coalesce_serials, mark_dirty
+from powerdns.tests.utils import DomainFactory, RecordFactory
+from powerdns.utils import AutoPtrOptions
+
+
+class SerialsMixin(object):
+
+    def setUp(self):
+        self.domains = [
+            DomainFactory(name=name, template=None, reverse_template=None)
+            for name in ['example.com', 'example.org']
+        ]
+        for domain in self.domains:
+            RecordFactory(
+                domain=domain,
+                type='SOA',
+                name=domain.name,
+                content='ns1.{0} hostmaster.{0} 0 43200 600 1209600 600'.
+                format(domain.name),
+            )
+            for i in range(5):
+                RecordFactory(
+                    domain=domain,
+                    type='A',
+                    name='host{}.{}'.format(i, domain.name),
+                    content='192.168.1.{}'.format(i),
+                    auto_ptr=AutoPtrOptions.NEVER,
+                )
+        Record.objects.filter(type='SOA').update(change_date=1)
+
+    def serials(self):
+        return dict(
+            Record.objects.filter(type='SOA').values_list(
+                'domain__name', 'change_date'
+            )
+        )
+
+    def soa_updates(self, context):
+        return [
+            query for query in context.captured_queries
+            if 'UPDATE "records"' in query['sql'] and
+            '"records"."type" =' in query['sql']
+        ]
+
+
+class TestSerials(SerialsMixin, TestCase):
+    """Tests for marking zones dirty"""
+
+    def test_immediate(self):
+        """Without a block or commit hooks serials are updated at once"""
+        mark_dirty(self.domains[0].pk)
+        self.assertGreater(self.serials()['example.com'], 1)
+        self.assertEqual(self.serials()['example.org'], 1)
+
+    def test_queryset_delete(self):
+        """Deleting many records updates each SOA once"""
+        with CaptureQueriesContext(connection) as context:
+            Record.objects.filter(type='A').delete()
+        self.assertEqual(len(self.soa_updates(context)), 1)
+        self.assertGreater(self.serials()['example.com'], 1)
+        self.assertGreater(self.serials()['example.org'], 1)
+
+    def test_nested(self):
+        """Only the outermost block updates serials"""
+        with CaptureQueriesContext(connection) as context:
+            with coalesce_serials():
+                for record in Record.objects.filter(type='A'):
+                    with coalesce_serials():
+                        record.ttl = 60
+                        record.save()
+                self.assertEqual(self.serials()['example.com'], 1)
+        self.assertEqual(len(self.soa_updates(context)), 1)
+        self.assertGreater(self.serials()['example.com'], 1)
+
+    def test_moved(self):
+        """A record moved to another zone changes both zones"""
+        record = Record.objects.get(name='host0.example.com')
+        record.domain = self.domains[1]
+        record.save()
+        self.assertGreater(self.serials()['example.com'], 1)
+        self.assertGreater(self.serials()['example.org'], 1)
+
+    def test_commit_hooks(self):
+        """Zones are updated by the first commit hook, also after a rollback
+        dropped the hooks of a transaction"""
+        hooks = []
+        with mock.patch.object(
+            transaction, 'on_commit',
+            lambda func, using=None: hooks.append(func), create=True,
+        ):
+            mark_dirty(self.domains[0].pk)
+            mark_dirty(self.domains[0].pk)
+            # Rolled back
+            del hooks[:]
+            mark_dirty(self.domains[1].pk)
+            mark_dirty(self.domains[1].pk)
+        self.assertEqual(self.serials()['example.com'], 1)
+        with CaptureQueriesContext(connection) as context:
+            for hook in hooks:
+                hook()
+        self.assertEqual(len(self.soa_updates(context)), 1)
+        self.assertGreater(self.serials()['example.com'], 1)
+        self.assertGreater(self.serials()['example.org'], 1)
+
+    def test_soa_saved(self):
+        """Saving the SOA itself doesn't update it again"""
+        soa = Record.objects.get(type='SOA', domain=self.domains[0])
+        with self.assertNumQueries(1):
+            soa.save()
+
+
+@unittest.skipUnless(
+    hasattr(transaction, 'on_commit'),
+    'Django is too old to run code on commit',
+)
+class TestSerialsOnCommit(SerialsMixin, TransactionTestCase):
+    """Tests for updating serials when a transaction is committed"""
+
+    def test_on_commit(self):
+        """Serials are updated once, after the commit"""
+        with CaptureQueriesContext(connection) as context:
+            with transaction.atomic():
+                for record in Record.objects.filter(type='A'):
+                    record.delete()
+                self.assertEqual(self.serials()['example.com'], 1)
+        self.assertEqual(len(self.soa_updates(context)), 1)
+        self.assertGreater(self.serials()['example.com'], 1)
+
+    def test_rollback(self):
+        """Zones marked in a rolled back transaction are forgotten"""
+        with transaction.atomic():
+            mark_dirty(self.domains[0].pk)
+            transaction.set_rollback(True)
+        with transaction.atomic():
+            mark_dirty(self.domains[0].pk)
+        self.assertGreater(self.serials()['example.com'], 1)
@@ -0,0 +1,101 @@
+"""Tests for searching records by subnets"""
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from powerdns.tests.utils import DomainFactory, RecordFactory, user_client
+from powerdns.utils import AutoPtrOptions
+
+
+class TestSubnets(TestCase):
+    """Tests for the subnet filters and address usage"""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            'user', 'user@example.com', 'password'
+        )
+        self.client = user_client(self.user)
+        domain = DomainFactory(
+            name='example.com',
+            template=None,
+            reverse_template=None,
+        )
+        DomainFactory(
+            name='20.10.in-addr.arpa',
+            template=None,
+            reverse_template=None,
+        )
+        for name, type_, content in [
+            ('www', 'A', '10.20.1.1'),
+            ('web', 'A', '10.20.1.1'),
+            ('mail', 'A', '10.20.2.1'),
+            ('ftp', 'A', '10.30.1.1'),
+            ('www', 'AAAA', '2001:db8::1'),
+            ('blog', 'CNAME', 'www.example.com'),
+        ]:
+            RecordFactory(
+                domain=domain,
+                type=type_,
+                name='{}.example.com'.format(name),
+                content=content,
+                auto_ptr=AutoPtrOptions.NEVER,
+            )
+
+    def names(self, response):
+        return sorted(
+            record['name'] for record in response.data['results']
+        )
+
+    def test_filter(self):
+        """Records are filtered by one or more subnets"""
+        response = self.client.get(
+            reverse('record-list'), {'subnet': '10.20.0.0/16'}
+        )
+        self.assertEqual(self.names(response), [
+            'mail.example.com', 'web.example.com', 'www.example.com',
+        ])
+        response = self.client.get(
+            reverse('record-list'),
+            {'subnet': ['10.30.0.0/16', '2001:db8::/32'], 'type': 'AAAA'},
+        )
+        self.assertEqual(self.names(response), ['www.example.com'])
+
+    def test_invalid(self):
+        """Invalid subnets are reported"""
+        response = self.client.get(
+            reverse('record-list'), {'subnet': '10.20.0.1/16'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('subnet', response.data)
+
+    def test_usage(self):
+        """Used and free addresses are counted"""
+        response = self.client.get(
+            reverse('record-usage'),
+            {'subnet': ['10.20.0.0/16', '2001:db8::/64']},
+        )
+        self.assertEqual(response.data, [
+            {
+                'subnet': '10.20.0.0/16',
+                'size': 65536,
+                'used': 2,
+                'free': 65534,
+            },
+            {
+                'subnet': '2001:db8::/64',
+                'size': 2 ** 64,
+                'used': 1,
+                'free': 2 ** 64 - 1,
+            },
+        ])
+
+    def test_admin(self):
+        """Records are filtered by subnets in the admin"""
+        self.client.login(username='user', password='password')
+        response = self.client.get(
+            reverse('admin:powerdns_record_changelist'),
+            {'subnet': '10.20.0.0/16'},
+        )
+        self.assertContains(response, '?subnet=10.20.0.0%2F16')
+        self.assertEqual(response.context['cl'].result_count, 3)
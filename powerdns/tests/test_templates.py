@@ -5,10 +5,18 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from powerdns.models.powerdns import Domain, Record
+from powerdns.models.powerdns import (
+    Domain,
+    Record,
+    get_default_reverse_domain,
+)
+from powerdns.models.templates import DomainTemplate, get_domain_template
 from powerdns.tests.utils import (
+    CachedTestCase,
     DomainTemplateFactory,
     RecordTemplateFactory,
     assert_does_exist,
@@ -17,7 +25,7 @@ from powerdns.tests.utils import (
 from powerdns.utils import AutoPtrOptions
 
 
-class TestTemplates(TestCase):
+class TemplatesMixin(object):
     """Test cases for a simple template"""
 
     def setUp(self):
@@ -174,3 +182,57 @@ class TestTemplates(TestCase):
         )
         self.assertEqual(domain.record_set.count(), 4)
         assert_does_exist(Record, domain=domain, content='ns2.example.com')
+
+
+class TestTemplates(TemplatesMixin, TestCase):
+    """The template tests without a cache"""
+
+
+class TestCachedTemplates(TemplatesMixin, CachedTestCase):
+    """The template tests with the template cache enabled"""
+
+    def setUp(self):
+        CachedTestCase.setUp(self)
+        TemplatesMixin.setUp(self)
+
+    def template_queries(self, context):
+        return [
+            query for query in context.captured_queries
+            if 'FROM "powerdns_domaintemplate"' in query['sql'] or
+            'FROM "powerdns_recordtemplate"' in query['sql']
+        ]
+
+    def test_cached(self):
+        """Templates are read once for many domains"""
+        Domain.objects.create(
+            name='example.com', template=self.domain_template2
+        )
+        with CaptureQueriesContext(connection) as context:
+            for name in ['example.net', 'example.org']:
+                Domain.objects.create(
+                    name=name, template=self.domain_template2
+                )
+            get_default_reverse_domain()
+        self.assertEqual(self.template_queries(context), [])
+        self.assertEqual(
+            Record.objects.filter(domain__name='example.org').count(), 3
+        )
+
+    def test_default_reverse_renamed(self):
+        """The default reverse template is looked up again when changed"""
+        self.assertEqual(get_default_reverse_domain(), self.reverse_template)
+        self.reverse_template.name = 'old-reverse'
+        self.reverse_template.save()
+        with self.assertRaises(DomainTemplate.DoesNotExist):
+            get_default_reverse_domain()
+        new_template = DomainTemplateFactory(name='reverse')
+        self.assertEqual(get_default_reverse_domain(), new_template)
+
+    def test_rolled_back(self):
+        """Templates of rolled back transactions are forgotten"""
+        with transaction.atomic():
+            DomainTemplateFactory(name='rolled-back')
+            get_domain_template(name='rolled-back')
+            transaction.set_rollback(True)
+        with self.assertRaises(DomainTemplate.DoesNotExist):
+            get_domain_template(name='rolled-back')
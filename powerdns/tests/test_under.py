@@ -0,0 +1,94 @@
+"""Tests for looking up names in the subtree of a domain"""
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from powerdns.bulk import bulk_create_records
+from powerdns.models.powerdns import Domain, Record
+from powerdns.tests.utils import DomainFactory, RecordFactory, user_client
+from powerdns.utils import AutoPtrOptions
+
+
+class TestUnder(TestCase):
+    """Tests for the reversed names and the ?under= filter"""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            'user', 'user@example.com', 'password'
+        )
+        self.client = user_client(self.user)
+        self.domain = DomainFactory(
+            name='example.com',
+            template=None,
+            reverse_template=None,
+        )
+        for name in [
+            'example.org', 'sub.example.com', 'notexample.com',
+            '1.168.192.in-addr.arpa',
+        ]:
+            DomainFactory(name=name, template=None, reverse_template=None)
+        for name in ['www.example.com', 'www.sub.example.com', 'example.com']:
+            RecordFactory(
+                domain=self.domain,
+                type='TXT',
+                name=name,
+                content='text',
+                auto_ptr=AutoPtrOptions.NEVER,
+            )
+
+    def names(self, response):
+        return sorted(
+            result['name'] for result in response.data['results']
+        )
+
+    def test_maintained(self):
+        """Reversed names follow renames"""
+        self.assertEqual(
+            Domain.objects.get(name='sub.example.com').reversed_name,
+            'com.example.sub',
+        )
+        record = Record.objects.get(name='www.example.com')
+        record.name = 'web.example.com'
+        record.save()
+        self.assertEqual(
+            Record.objects.get(pk=record.pk).reversed_name, 'com.example.web'
+        )
+        bulk_create_records([Record(
+            domain=self.domain,
+            type='TXT',
+            name='bulk.example.com',
+            content='text',
+            auto_ptr=AutoPtrOptions.NEVER,
+        )])
+        self.assertEqual(
+            list(Record.objects.under('bulk.example.com').values_list(
+                'name', flat=True
+            )),
+            ['bulk.example.com'],
+        )
+
+    def test_api(self):
+        """Domains and records are filtered by ?under="""
+        response = self.client.get(
+            reverse('domain-list'), {'under': 'example.com'}
+        )
+        self.assertEqual(
+            self.names(response), ['example.com', 'sub.example.com']
+        )
+        response = self.client.get(
+            reverse('record-list'), {'under': 'sub.example.com'}
+        )
+        self.assertEqual(self.names(response), ['www.sub.example.com'])
+
+    def test_admin(self):
+        """The admin tells reverse domains from forward ones"""
+        self.client.login(username='user', password='password')
+        response = self.client.get(
+            reverse('admin:powerdns_domain_changelist'),
+            {'domain_class': 'rev'},
+        )
+        self.assertEqual(
+            [domain.name for domain in response.context['cl'].result_list],
+            ['1.168.192.in-addr.arpa'],
+        )
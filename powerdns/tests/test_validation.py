@@ -0,0 +1,100 @@
+"""Tests for the model-free validation of record contents"""
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import SimpleTestCase
+
+from powerdns.tests.utils import DomainFactory, RecordTestCase, user_client
+from powerdns.utils import AutoPtrOptions
+from powerdns.validation import validate_content, validate_contents
+
+
+class TestValidateContent(SimpleTestCase):
+    """Tests for the validators of record types"""
+
+    def test_valid(self):
+        """Valid contents of all validated types"""
+        for type_, content in [
+            ('A', '192.168.1.1'),
+            ('AAAA', '2001:db8::1'),
+            ('CNAME', 'www.example.com'),
+            ('MX', 'mail.example.com'),
+            ('SRV', '10 5060 sip.example.com'),
+            ('NAPTR', '100 10 "u" "E2U+sip" "!^.*$!sip:info@example.com!" .'),
+            ('NAPTR', '100 50 "s" "SIP+D2U" "" _sip._udp.example.com'),
+            ('TXT', '"v=spf1 mx -all"'),
+            ('TXT', 'v=DKIM1; k=RSA;'),
+            ('SOA', 'ns1.example.com. hostmaster.example.com. 1 2 3 4 5'),
+            ('HINFO', 'anything'),
+        ]:
+            self.assertIsNone(validate_content(type_, content), content)
+
+    def test_invalid(self):
+        """Invalid contents of all validated types"""
+        for type_, content in [
+            ('A', '192.168.1.256'),
+            ('AAAA', '192.168.1.1'),
+            ('CNAME', 'www.example.com.'),
+            ('MX', '10 mail.example.com'),
+            ('SRV', '10 70000 sip.example.com'),
+            ('SRV', 'sip.example.com'),
+            ('NAPTR', 'www.example.com'),
+            ('TXT', '"v=spf1 mx -all'),
+            ('TXT', ''),
+            ('SOA', 'ns1.example.com hostmaster.example.com 1 2 3 4 x'),
+        ]:
+            self.assertIsNotNone(validate_content(type_, content), content)
+
+    def test_batch(self):
+        """Errors of a batch are reported with their indexes"""
+        errors = validate_contents([
+            ('A', '192.168.1.1'),
+            ('A', 'www.example.com'),
+            ('CNAME', 'www.example.com'),
+            ('AAAA', '2001:db8::x'),
+        ])
+        self.assertEqual(
+            [(error.index, error.type) for error in errors],
+            [(1, 'A'), (3, 'AAAA')],
+        )
+
+
+class TestContentValidation(RecordTestCase):
+    """Record contents are validated by models and the API"""
+
+    def test_model(self):
+        """MX and SRV records are validated by full_clean"""
+        self.validate(name='example.com', type='MX', content='mx.example.com')
+        self.check_invalid(
+            name='_sip._udp.example.com', type='SRV', content='x y z',
+        )
+
+    def test_api(self):
+        """The API reports invalid contents"""
+        user = User.objects.create_superuser(
+            'user', 'user@example.com', 'password'
+        )
+        DomainFactory(name='example.org', template=None, owner=user)
+        response = user_client(user).post(reverse('record-list'), {
+            'name': 'www.example.org',
+            'type': 'A',
+            'content': 'www.example.com',
+            'auto_ptr': AutoPtrOptions.NEVER.id,
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('content', response.data)
+
+    def test_api_null(self):
+        """The API reports null contents"""
+        user = User.objects.create_superuser(
+            'user', 'user@example.com', 'password'
+        )
+        DomainFactory(name='example.org', template=None, owner=user)
+        response = user_client(user).post(reverse('record-list'), {
+            'name': 'www.example.org',
+            'type': 'A',
+            'content': None,
+            'auto_ptr': AutoPtrOptions.NEVER.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('content', response.data)
@@ -2,11 +2,13 @@
 
 import functools as ft
 
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from factory.django import DjangoModelFactory
 from rest_framework.test import APIClient
 
+from powerdns.cache import end_transactions
 from powerdns.models.powerdns import Record, Domain
 from powerdns.models.templates import RecordTemplate, DomainTemplate
 
@@ -35,6 +37,8 @@ class RecordTestCase(TestCase):
     """Base class for tests on records."""
 
     def setUp(self):
+        # Reverse domains of A records are created from the default template
+        DomainTemplateFactory(name='reverse')
         self.domain = DomainFactory(
             name='example.com',
             template=None,
@@ -56,6 +60,23 @@ class RecordTestCase(TestCase):
             self.validate(**values)
 
 
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'powerdns-tests',
+    }
+})
+class CachedTestCase(TransactionTestCase):
+    """Base class for tests that rely on the Django cache being enabled.
+    Caches only keep committed changes, so tests aren't run in a
+    transaction."""
+
+    def setUp(self):
+        cache.clear()
+        # Forget the transactions of the previous tests
+        end_transactions(sender=None)
+
+
 def user_client(user):
     """Returns client for a given user"""
     client = APIClient()
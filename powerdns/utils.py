@@ -1,5 +1,8 @@
 """Utilities for powerdns models"""
 
+import itertools
+from collections import defaultdict
+
 from pkg_resources import working_set, Requirement
 
 import rules
@@ -7,31 +10,19 @@ from django.conf import settings
 from django.contrib.contenttypes.fields import GenericRelation
 from django.core.mail import send_mail
 from django.core.exceptions import ValidationError
-from django.core.validators import validate_ipv4_address, RegexValidator
-from django.db import models
+from django.core.validators import RegexValidator
+from django.db import models, transaction
 from django.utils.translation import ugettext_lazy as _
 from threadlocals.threadlocals import get_current_user
 from dj.choices import Choices
 from IPy import IP
 
-
-def validate_ipv6_address(value):
-    try:
-        ip = IP(value)
-    except ValueError:
-        ip = None
-    if not ip or ip.version() == 4:
-        raise ValidationError(
-            _(u'Enter a valid IPv6 address.'), code='invalid',
-        )
+from powerdns.validation import validate_content
 
 
 VERSION = working_set.find(Requirement.parse('django-powerdns-dnssec')).version
 
 
-DOMAIN_NAME_RECORDS = ('CNAME', 'MX', 'NAPTR', 'NS', 'PTR')
-
-
 # Validator for the domain names only in RFC-1035
 # PowerDNS considers the whole zone to be invalid if any of the records end
 # with a period so this custom validator is used to catch them
@@ -46,48 +37,6 @@ validate_domain_name = RegexValidator(
 )
 
 
-validate_dn_optional_dot = RegexValidator(
-    '^[A-Za-z0-9.-]*$'
-)
-
-
-validate_time = RegexValidator('^[0-9]+$')
-
-
-def validate_soa(value):
-    """Validator for a correct SOA record"""
-    try:
-        name, email, sn, refresh, retry, expiry, nx = value.split()
-    except ValueError:
-        raise ValidationError(_('Enter a valid SOA record'))
-    for subvalue, field in [
-        (name, 'Domain name'),
-        (email, 'e-mail'),
-    ]:
-        try:
-            validate_dn_optional_dot(subvalue)
-        except ValidationError:
-            raise ValidationError(
-                _('Incorrect {}. Should be a valid domain name.'.format(
-                    field
-                ))
-            )
-    for subvalue, field in [
-        (sn, 'Serial'),
-        (refresh, 'Refresh rate'),
-        (retry, 'Retry rate'),
-        (expiry, 'Expiry time'),
-        (nx, 'Negative resp. time'),
-    ]:
-        try:
-            validate_time(subvalue)
-        except ValidationError:
-            raise ValidationError(
-                _('Incorrect {}. Should be a valid domain name.'.format(
-                    field
-                ))
-            )
-
 # Due to the idiotic way permissions work in admin, we need to give users
 # generic 'change' view (so they see the changelist), bo no generic 'delete'
 # view (so they can't bulk-delete).
@@ -100,16 +49,25 @@ def no_object(user, object_):
 
 @rules.predicate
 def is_owner(user, object_):
-    return object_ and object_.owner == user
+    # Compare ids, so that the owner doesn't have to be fetched
+    return bool(object_) and object_.owner_id is not None and (
+        object_.owner_id == getattr(user, 'pk', None)
+    )
 
 
 @rules.predicate
 def is_authorised(user, object_):
-    return object_ and user in (
-        authorisation.authorised
+    # Authorisations may have been prefetched (e.g. for a whole changelist
+    # page), so they are iterated rather than filtered
+    user_id = getattr(user, 'pk', None)
+    return bool(object_) and user_id is not None and any(
+        authorisation.authorised_id == user_id
         for authorisation in object_.authorisations.all()
     )
-    return not object_ or object_.owner == user
+
+
+# Original value of a field that was not loaded from the database
+_DEFERRED = object()
 
 
 class TimeTrackable(models.Model):
@@ -121,16 +79,84 @@ class TimeTrackable(models.Model):
         verbose_name=_('last modified'), auto_now=True, editable=False,
     )
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._initial_values = {
-            field.name: getattr(self, field.name, None)
-            for field in self._meta.fields
-        }
-
     class Meta:
         abstract = True
 
+    # Changes are tracked only for objects loaded from (or saved to) the
+    # database. The original value of a field is remembered on its first
+    # assignment, so objects that are only read carry no snapshot at all.
+    _track_changes = False
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._start_tracking()
+        return instance
+
+    @classmethod
+    def _get_tracked_attnames(cls):
+        try:
+            return cls.__dict__['_tracked_attnames']
+        except KeyError:
+            cls._tracked_attnames = frozenset(
+                field.attname for field in cls._meta.concrete_fields
+            )
+            return cls._tracked_attnames
+
+    def _start_tracking(self):
+        self.__dict__['_track_changes'] = True
+        self.__dict__.pop('_original_values', None)
+
+    def __setattr__(self, name, value):
+        # This runs for every field of every loaded object, keep it cheap
+        if self._track_changes:
+            self._remember_original_value(name)
+        object.__setattr__(self, name, value)
+
+    def _remember_original_value(self, name):
+        if name in self._get_tracked_attnames():
+            original_values = self.__dict__.setdefault('_original_values', {})
+            if name not in original_values:
+                original_values[name] = self.__dict__.get(name, _DEFERRED)
+
+    def get_changed_fields(self):
+        """Return the set of names of fields that were changed since the
+        object was loaded or saved. None means that the object wasn't saved
+        yet, so everything should be considered changed."""
+        if not self._track_changes:
+            return None
+        original_values = self.__dict__.get('_original_values', {})
+        return {
+            field.name
+            for field in self._meta.concrete_fields
+            if field.attname in original_values and
+            original_values[field.attname] != self.__dict__[field.attname]
+        }
+
+    def get_original_value(self, attname):
+        """Return the value of a field as it was loaded or last saved (or
+        the current value for new objects)."""
+        value = self.__dict__.get('_original_values', {}).get(
+            attname, self.__dict__.get(attname)
+        )
+        return None if value is _DEFERRED else value
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._start_tracking()
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None or not self._track_changes:
+            self._start_tracking()
+            return
+        # Reading a deferred field reloads only that field, the changes of
+        # the others are still to be saved
+        original_values = self.__dict__.get('_original_values', {})
+        for field in self._meta.concrete_fields:
+            if field.attname in fields or field.name in fields:
+                original_values.pop(field.attname, None)
+
 
 class Owned(models.Model):
     """Model that has an owner. This owner is set as default to the creator
@@ -212,6 +238,175 @@ def to_reverse(ip):
     return (domain, number)
 
 
+def reverse_labels(name):
+    """
+    Return a domain name with its labels in reverse order. Names in the
+    subtree of a domain then share a prefix.
+
+    >>> reverse_labels('www.example.com')
+    'com.example.www'
+    """
+    return '.'.join(name.lower().split('.')[::-1])
+
+
+def reverse_name(ip):
+    """
+    Return the full reverse name of an IPv4 or IPv6 address
+
+    >>> reverse_name('192.168.1.1')
+    '1.1.168.192.in-addr.arpa'
+    >>> reverse_name('2001:db8::1')[-24:]
+    '8.b.d.0.1.0.0.2.ip6.arpa'
+    """
+    return IP(ip).reverseName().rstrip('.')
+
+
+class ZoneTree(object):
+    """
+    Zones in a prefix tree of their labels (read from the right), so that
+    the most specific zone of a name (e.g. the reverse name of an address) is
+    found in one walk over its labels
+
+    >>> tree = ZoneTree([
+    ...     ('168.192.in-addr.arpa', 1), ('1.168.192.in-addr.arpa', 2),
+    ... ])
+    >>> tree.find('1.1.168.192.in-addr.arpa')
+    ('1.168.192.in-addr.arpa', 2)
+    >>> tree.find('1.2.168.192.in-addr.arpa')
+    ('168.192.in-addr.arpa', 1)
+    >>> tree.remove('168.192.in-addr.arpa')
+    >>> tree.find('1.2.168.192.in-addr.arpa') is None
+    True
+    """
+
+    def __init__(self, zones=()):
+        self._root = {}
+        for name, pk in zones:
+            self.add(name, pk)
+
+    @staticmethod
+    def _labels(name):
+        return name.lower().rstrip('.').split('.')[::-1]
+
+    def add(self, name, pk):
+        node = self._root
+        for label in self._labels(name):
+            node = node.setdefault(label, {})
+        # Labels are never None, so it marks the zone ending at the node
+        node[None] = (name, pk)
+
+    def remove(self, name):
+        labels = self._labels(name)
+        path = [self._root]
+        for label in labels:
+            if label not in path[-1]:
+                return
+            path.append(path[-1][label])
+        path[-1].pop(None, None)
+        # Prune the nodes that lead to no zone anymore
+        for label, parent in zip(reversed(labels), reversed(path[:-1])):
+            if parent[label]:
+                break
+            del parent[label]
+
+    def find(self, name):
+        """Return the (name, pk) of the most specific zone containing `name`
+        or None"""
+        node = self._root
+        found = None
+        for label in self._labels(name):
+            node = node.get(label)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+
+def reverse_to_network(name):
+    """
+    Return the network (as an IP object) whose addresses have PTRs in the
+    given reverse domain, or None if it isn't a reverse domain
+
+    >>> reverse_to_network('1.168.192.in-addr.arpa')
+    IP('192.168.1.0/24')
+    >>> reverse_to_network('8.b.d.0.1.0.0.2.ip6.arpa')
+    IP('2001:db8::/32')
+    >>> reverse_to_network('example.com')
+    """
+    for suffix, separator, bits, size in [
+        ('.in-addr.arpa', '.', 8, 4),
+        ('.ip6.arpa', '', 4, 32),
+    ]:
+        if not name.endswith(suffix):
+            continue
+        labels = name[:-len(suffix)].split('.')[::-1]
+        if len(labels) > size or not separator and any(
+            len(label) != 1 for label in labels
+        ):
+            return None
+        if separator:
+            address = '.'.join(labels + ['0'] * (size - len(labels)))
+        else:
+            digits = ''.join(labels).ljust(size, '0')
+            address = ':'.join(
+                digits[i:i + 4] for i in range(0, size, 4)
+            )
+        try:
+            return IP('{}/{}'.format(address, len(labels) * bits))
+        except ValueError:
+            return None
+    return None
+
+
+# IPv6 addresses are stored as two signed 64 bit numbers, offset so that
+# they sort like the addresses
+INT64_OFFSET = 2 ** 63
+
+
+def split_ipv6(number):
+    """
+    Split a 128 bit IPv6 address into its (high, low) 64 bit halves, as
+    signed numbers
+
+    >>> split_ipv6(0)
+    (-9223372036854775808, -9223372036854775808)
+    >>> split_ipv6(2 ** 128 - 1)
+    (9223372036854775807, 9223372036854775807)
+    >>> split_ipv6(2 ** 64 + 1)
+    (-9223372036854775807, -9223372036854775807)
+    """
+    return (
+        (number >> 64) - INT64_OFFSET,
+        (number & (2 ** 64 - 1)) - INT64_OFFSET,
+    )
+
+
+def chunks(iterable, size):
+    """
+    Split an iterable into lists of at most `size` elements
+
+    >>> list(chunks(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def on_commit(func, using=None):
+    """Call `func` after the current transaction is committed. Django < 1.9
+    can't do it, so `func` is called immediately there."""
+    try:
+        hook = transaction.on_commit
+    except AttributeError:
+        func()
+    else:
+        hook(func, using=using)
+
+
 class AutoPtrOptions(Choices):
     _ = Choices.Choice
     NEVER = _("Never")
@@ -267,6 +462,78 @@ def format_recursive(template, arguments):
         return template
 
 
+# Names of records checked for conflicts in one query. Each costs up to two
+# query parameters, SQLite allows 999.
+CONFLICTS_BATCH_SIZE = 400
+
+
+def find_conflicts(objects):
+    """
+    Find the existing records that conflict with record-like objects (records
+    or record requests): a CNAME can't share its name with any other record.
+    The names of all objects are looked up with one query per batch, fetching
+    only ids and types. Returns a list of (object, conflicting ids) pairs.
+    """
+    from powerdns.models.powerdns import Record
+    names = {object_.get_field('name') for object_ in objects}
+    cname_names = {
+        object_.get_field('name') for object_ in objects
+        if object_.get_field('type') == 'CNAME'
+    }
+    existing = defaultdict(list)
+    for batch in chunks(names, CONFLICTS_BATCH_SIZE):
+        # Other records are only needed for the names of new CNAMEs
+        query = models.Q(type='CNAME')
+        batch_cname_names = cname_names.intersection(batch)
+        if batch_cname_names:
+            query |= models.Q(name__in=batch_cname_names)
+        for pk, name, type_ in Record.objects.filter(query).filter(
+            name__in=batch,
+        ).order_by('pk').values_list('pk', 'name', 'type'):
+            existing[name].append((pk, type_))
+    conflicts = []
+    for object_ in objects:
+        type_ = object_.get_field('type')
+        record_pk = object_.get_record_pk()
+        pks = [
+            pk for pk, existing_type in existing[object_.get_field('name')]
+            if pk != record_pk and 'CNAME' in (type_, existing_type)
+        ]
+        if pks:
+            conflicts.append((object_, pks))
+    return conflicts
+
+
+def validate_conflicts(objects):
+    """Check many record-like objects for conflicts with existing records and
+    with each other at once, raising a single ValidationError listing all of
+    them."""
+    errors = [
+        '{}: Conflicting records exist: {}'.format(
+            object_, ', '.join(str(pk) for pk in pks)
+        )
+        for object_, pks in find_conflicts(objects)
+    ]
+    by_name = defaultdict(list)
+    for object_ in objects:
+        by_name[object_.get_field('name')].append(object_)
+    for object_ in objects:
+        if object_.get_field('type') != 'CNAME':
+            continue
+        record_pk = object_.get_record_pk()
+        if any(
+            other is not object_ and (
+                record_pk is None or other.get_record_pk() != record_pk
+            )
+            for other in by_name[object_.get_field('name')]
+        ):
+            errors.append(
+                '{}: Conflicting records are created with it'.format(object_)
+            )
+    if errors:
+        raise ValidationError(errors)
+
+
 class RecordLike(models.Model):
     """Object validated like a record"""
 
@@ -289,43 +556,28 @@ class RecordLike(models.Model):
 
     def clean_content_field(self):
         """Perform a type-dependent validation of content field"""
-        type_ = self.get_field('type')
-        content = self.get_field('content')
-        if type_ == 'A':
-            validate_ipv4_address(content)
-        elif type_ == 'AAAA':
-            validate_ipv6_address(content)
-        elif type_ == 'SOA':
-            validate_soa(content)
-        elif type_ in DOMAIN_NAME_RECORDS:
-            validate_domain_name(content)
+        message = validate_content(
+            self.get_field('type'), self.get_field('content') or '',
+        )
+        if message is not None:
+            raise ValidationError(message)
 
     def validate_for_conflicts(self):
         """Ensure this record doesn't conflict with other records."""
-        from powerdns.models.requests import Record
-
-        def check_unique(comment, **kwargs):
-            conflicting = Record.objects.filter(**kwargs)
-            record_pk = self.get_record_pk()
-            if record_pk is not None:
-                conflicting = conflicting.exclude(pk=record_pk)
-            if conflicting:
-                raise ValidationError(comment.format(
-                    ', '.join(str(record.id) for record in conflicting)
-                ))
-        if self.get_field('type') == 'CNAME':
-            check_unique(
-                'Cannot create CNAME record. Following conflicting '
-                'records exist: {}',
-                name=self.get_field('name'),
-            )
-        else:
-            check_unique(
-                'Cannot create a record. Following conflicting CNAME'
-                'record exists: {}',
-                type='CNAME',
-                name=self.get_field('name'),
-            )
+        for _object, pks in find_conflicts([self]):
+            if self.get_field('type') == 'CNAME':
+                comment = (
+                    'Cannot create CNAME record. Following conflicting '
+                    'records exist: {}'
+                )
+            else:
+                comment = (
+                    'Cannot create a record. Following conflicting CNAME'
+                    'record exists: {}'
+                )
+            raise ValidationError(comment.format(
+                ', '.join(str(pk) for pk in pks)
+            ))
 
     def force_case(self):
         """Force the name and content case to upper and lower respectively"""
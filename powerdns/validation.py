@@ -0,0 +1,154 @@
+"""Validation of record contents on plain values.
+
+Validators are registered per record type. They take the content of a
+record and return an error message, or None if the content is valid, so
+whole batches (e.g. zone imports) can be validated without instantiating
+models or raising an exception per row. Record types without a validator
+accept any content.
+"""
+
+import re
+from collections import namedtuple
+
+from django.utils.translation import ugettext as _
+from IPy import IP
+
+
+# An invalid row of a batch
+ContentError = namedtuple('ContentError', 'index type content message')
+
+_validators = {}
+
+
+def register(*types):
+    """Register the decorated function as the validator of record types"""
+    def decorator(function):
+        for type_ in types:
+            _validators[type_] = function
+        return function
+    return decorator
+
+
+def get_validator(type_):
+    """Return the validator of a record type, or None"""
+    return _validators.get(type_)
+
+
+# Same as powerdns.utils.validate_domain_name. PowerDNS considers the whole
+# zone to be invalid if any of the records end with a period.
+DOMAIN_NAME_RE = re.compile(r'^(\*\.)?([_A-Za-z0-9-]+\.)*([A-Za-z0-9])+$')
+DN_OPTIONAL_DOT_RE = re.compile(r'^[A-Za-z0-9.-]*$')
+# Same as django.core.validators.validate_ipv4_address
+IPV4_RE = re.compile(
+    r'^(25[0-5]|2[0-4]\d|[0-1]?\d?\d)(\.(25[0-5]|2[0-4]\d|[0-1]?\d?\d)){3}\Z'
+)
+NUMBER_RE = re.compile(r'^[0-9]+$')
+# order preference "flags" "service" "regexp" replacement
+NAPTR_RE = re.compile(
+    r'^([0-9]+) ([0-9]+) "[A-Za-z0-9]*" "[^"]*" "[^"]*" (\S+)$'
+)
+
+
+def _is_domain_name(value):
+    return DOMAIN_NAME_RE.match(value) is not None
+
+
+def _is_uint16(value):
+    return NUMBER_RE.match(value) is not None and int(value) < 2 ** 16
+
+
+@register('A')
+def validate_a(content):
+    if IPV4_RE.match(content) is None:
+        return _('Enter a valid IPv4 address.')
+
+
+@register('AAAA')
+def validate_aaaa(content):
+    try:
+        ip = IP(content)
+    except ValueError:
+        ip = None
+    if not ip or ip.version() == 4:
+        return _('Enter a valid IPv6 address.')
+
+
+@register('CNAME', 'MX', 'NS', 'PTR')
+def validate_domain_name(content):
+    if not _is_domain_name(content):
+        return _('Enter a valid domain name.')
+
+
+@register('SOA')
+def validate_soa(content):
+    fields = content.split()
+    if len(fields) != 7:
+        return _('Enter a valid SOA record')
+    for value, field in zip(fields[:2], ['Domain name', 'e-mail']):
+        if DN_OPTIONAL_DOT_RE.match(value) is None:
+            return _('Incorrect {}. Should be a valid domain name.').format(
+                field
+            )
+    for value, field in zip(fields[2:], [
+        'Serial', 'Refresh rate', 'Retry rate', 'Expiry time',
+        'Negative resp. time',
+    ]):
+        if NUMBER_RE.match(value) is None:
+            return _('Incorrect {}. Should be a number.').format(field)
+
+
+@register('SRV')
+def validate_srv(content):
+    # The priority is kept in a separate field
+    fields = content.split()
+    if not (
+        len(fields) == 3 and _is_uint16(fields[0]) and
+        _is_uint16(fields[1]) and _is_domain_name(fields[2])
+    ):
+        return _('Enter a valid SRV record: weight port target')
+
+
+@register('NAPTR')
+def validate_naptr(content):
+    match = NAPTR_RE.match(content)
+    if not (
+        match and _is_uint16(match.group(1)) and
+        _is_uint16(match.group(2)) and
+        (match.group(3) == '.' or _is_domain_name(match.group(3)))
+    ):
+        return _(
+            'Enter a valid NAPTR record: order preference "flags" '
+            '"service" "regexp" replacement'
+        )
+
+
+@register('TXT', 'SPF')
+def validate_txt(content):
+    if not content:
+        return _('Enter a text')
+    if (content.count('"') - content.count('\\"')) % 2:
+        return _('Unbalanced quotes')
+
+
+def validate_content(type_, content):
+    """Return an error message for the content of a record of given type,
+    or None if it's valid."""
+    validator = _validators.get(type_)
+    if validator is None:
+        return None
+    return validator(content)
+
+
+def validate_contents(rows):
+    """Validate an iterable of (type, content) pairs. Returns a list of
+    ContentError for the invalid ones."""
+    validators = _validators
+    errors = []
+    for index, (type_, content) in enumerate(rows):
+        validator = validators.get(type_)
+        if validator is None:
+            continue
+        message = validator(content)
+        if message is not None:
+            errors.append(ContentError(index, type_, content, message))
+    return errors
@@ -4,6 +4,7 @@ from django.core.urlresolvers import reverse
 from django.shortcuts import redirect
 from django.views.generic.base import TemplateView
 
+from powerdns.bulk import delete_domain
 from powerdns.models import (
     CryptoKey,
     DeleteRequest,
@@ -16,7 +17,11 @@ from powerdns.models import (
     RecordRequest,
     SuperMaster,
 )
-from rest_framework.filters import DjangoFilterBackend
+from IPy import IP
+from rest_framework.decorators import list_route
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, DjangoFilterBackend
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
 from powerdns.serializers import (
@@ -36,6 +41,52 @@ class FiltersMixin(object):
     filter_backends = (DjangoFilterBackend,)
 
 
+def get_subnets(request):
+    """Return the networks given with ?subnet= parameters"""
+    try:
+        return [
+            IP(subnet) for subnet in request.query_params.getlist('subnet')
+        ]
+    except ValueError as e:
+        raise ValidationError({'subnet': [str(e)]})
+
+
+class SubnetFilter(BaseFilterBackend):
+    """Filter A and AAAA records by ?subnet=10.20.0.0/16 using the indexed
+    numeric form of their addresses"""
+
+    def filter_queryset(self, request, queryset, view):
+        subnets = get_subnets(request)
+        if not subnets:
+            return queryset
+        result = queryset.in_network(subnets[0])
+        for subnet in subnets[1:]:
+            result |= queryset.in_network(subnet)
+        return result
+
+
+class UnderFilter(BaseFilterBackend):
+    """Filter domains or records by ?under=example.com, i.e. the name and
+    everything in its subtree, using the indexed reversed names"""
+
+    def filter_queryset(self, request, queryset, view):
+        under = request.query_params.get('under')
+        if not under:
+            return queryset
+        return queryset.under(under)
+
+
+class EditableFilter(BaseFilterBackend):
+    """Filter domains or records by ?editable=1, i.e. the ones the user may
+    change, in the database"""
+
+    def filter_queryset(self, request, queryset, view):
+        editable = request.query_params.get('editable', '')
+        if editable.lower() not in ('1', 'true', 'yes'):
+            return queryset
+        return queryset.editable_by(request.user)
+
+
 class OwnerViewSet(FiltersMixin, ModelViewSet):
     """Base view for objects with owner"""
 
@@ -51,16 +102,39 @@ class DomainViewSet(OwnerViewSet):
 
     queryset = Domain.objects.all()
     serializer_class = DomainSerializer
+    filter_backends = FiltersMixin.filter_backends + (
+        UnderFilter, EditableFilter,
+    )
     filter_fields = ('name', 'type')
 
+    def perform_destroy(self, instance):
+        delete_domain(instance)
+
 
 class RecordViewSet(OwnerViewSet):
 
     queryset = Record.objects.all()
     serializer_class = RecordSerializer
+    filter_backends = FiltersMixin.filter_backends + (
+        SubnetFilter, UnderFilter, EditableFilter,
+    )
     filter_fields = ('name', 'type', 'content', 'domain')
     search_fields = filter_fields
 
+    @list_route()
+    def usage(self, request):
+        """Used and free address counts of the ?subnet= networks"""
+        result = []
+        for subnet in get_subnets(request):
+            used = self.get_queryset().in_network(subnet).count_addresses()
+            result.append({
+                'subnet': subnet.strCompressed(),
+                'size': subnet.len(),
+                'used': used,
+                'free': subnet.len() - used,
+            })
+        return Response(result)
+
 
 class CryptoKeyViewSet(FiltersMixin, ModelViewSet):
 